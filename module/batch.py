@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kociemba
+
+from module.color import ColorUtils
+from module.cube_batch import verify_solutions
+from module.cubie import FACES, CubeStateError, check_cube, normalize_centers
+from module.solver import warm_up
+
+COLOR_LETTERS = 'rgbywo'
+
+
+def parse_cube_line(text: str) -> str:
+    # facelet 문자열(URFDLB)과 색상 문자열(rgbywo) 둘 다 받는다.
+    if set(text) <= set(FACES):
+        return text
+    if set(text) <= set(COLOR_LETTERS):
+        return ColorUtils.color_string_to_face(text)
+    raise CubeStateError(f"not a facelet or color string: {text}")
+
+
+def solve_line(item) -> dict:
+    line_no, text = item
+    start = time.perf_counter()
+    result = {'line': line_no, 'input': text}
+    try:
+        cubestring = parse_cube_line(text)
+        valid, reason = check_cube(cubestring)
+        if not valid:
+            raise CubeStateError(reason)
+        moves = kociemba.solve(normalize_centers(cubestring))
+        result['moves'] = moves
+        result['move_count'] = len(moves.split())
+    except ValueError as e:
+        result['error'] = str(e)
+    result['elapsed'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def read_cube_lines(f, skip=()):
+    for line_no, line in enumerate(f, start=1):
+        # '#' 뒤는 주석 (python -m module.scramble --with-scramble 출력의 섞기 수순 등)
+        text = line.split('#', 1)[0].strip()
+        if not text or line_no in skip:
+            continue
+        yield line_no, text
+
+
+def finished_lines(path) -> set:
+    # 이어서 실행할 때 이미 결과가 기록된 줄 번호를 모은다. 중간에 잘린 마지막 줄은 잘라낸다.
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    end = 0
+    # 파일 전체를 읽지 않고 한 줄씩 본다. 줄바꿈으로 끝난 줄까지의 위치만 기억한다.
+    with open(path, 'rb+') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                f.truncate(end)
+                break
+            end += len(line)
+            try:
+                done.add(json.loads(line)['line'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def run_batch(lines, out, workers=None, order='input', window=None):
+    workers = workers or os.cpu_count() or 1
+    # 메모리 사용량이 입력 크기와 무관하도록 동시에 처리 중인 작업 수를 제한한다.
+    window = window or workers * 4
+    stats = {'solved': 0, 'failed': 0, 'unverified': 0}
+    finished = []
+
+    def flush():
+        # 모아둔 결과의 풀이를 입력 큐브에 한꺼번에 적용해서 정말 풀리는지 확인한 뒤 기록한다.
+        solved = [result for result in finished if 'moves' in result]
+        if solved:
+            cubestrings = [parse_cube_line(result['input']) for result in solved]
+            for index in verify_solutions(cubestrings, [result['moves'] for result in solved]):
+                solved[index]['error'] = 'solution does not solve the cube'
+                stats['unverified'] += 1
+        for result in finished:
+            stats['failed' if 'error' in result else 'solved'] += 1
+            out.write(json.dumps(result) + '\n')
+        out.flush()
+        finished.clear()
+
+    def write(result):
+        finished.append(result)
+        if len(finished) >= window:
+            flush()
+
+    # 각 작업 프로세스는 첫 큐브를 받기 전에 solver를 예열한다.
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as executor:
+        pending = deque()
+        for item in lines:
+            pending.append(executor.submit(solve_line, item))
+            while len(pending) >= window:
+                if order == 'input':
+                    write(pending.popleft().result())
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        write(future.result())
+        if order == 'input':
+            for future in pending:
+                write(future.result())
+        else:
+            for future in as_completed(pending):
+                write(future.result())
+    flush()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve cube strings from a file and write JSONL results')
+    parser.add_argument('input', help="file with one facelet or color string per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', help='JSONL output file (default: stdout)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of solver processes (default: all cores)')
+    parser.add_argument('--order', choices=('input', 'completion'), default='input')
+    parser.add_argument('--resume', action='store_true', help='skip lines already present in the output file')
+    args = parser.parse_args(argv)
+
+    skip = finished_lines(args.output) if args.resume and args.output else set()
+    source = sys.stdin if args.input == '-' else open(args.input, 'r')
+    out = open(args.output, 'a' if args.resume else 'w') if args.output else sys.stdout
+
+    start = time.perf_counter()
+    try:
+        stats = run_batch(read_cube_lines(source, skip), out, args.workers, args.order)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    total = stats['solved'] + stats['failed']
+    print(f"solved {stats['solved']}, failed {stats['failed']} ({stats['unverified']} unverified), skipped {len(skip)} in {elapsed:.2f}s"
+          f" ({total / elapsed if elapsed else 0:.1f} cubes/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# 화면 없이도 Cube(QObject)와 QImage를 만들 수 있도록 한다.
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from module.color import COLOR_MODEL, ColorUtils
+from module.cube import Cube
+from module.detection import DetectionEngine
+from module.localization import CubeLocator
+from module.overlay import OverlayRenderer
+from module.scramble import random_states
+from module.solve_cache import SOLUTION_CACHE
+from module.solver import warm_up
+from module.stability import StickerVoteBuffer
+from module.synthetic import SyntheticFaceGenerator
+
+# 기준보다 이 비율 이상 느려지면 회귀로 본다.
+DEFAULT_THRESHOLD = 0.25
+
+
+def summarize(seconds, items_per_call=1, unit='calls') -> dict:
+    # 호출별 소요 시간(초) -> 밀리초 단위 p50/p95/p99와 초당 처리량
+    ms = np.asarray(seconds, dtype=np.float64) * 1e3
+    total = ms.sum() / 1e3
+    return {
+        'count': len(ms),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'throughput': round(len(ms) * items_per_call / total, 2) if total > 0 else 0.0,
+        'throughput_unit': f'{unit}/s',
+    }
+
+
+def time_calls(func, items, warmup=3) -> list[float]:
+    for item in items[:warmup]:
+        func(item)
+    seconds = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def _frames(count, size, seed):
+    generator = SyntheticFaceGenerator(size, seed)
+    return list(generator.render(generator.random_labels(count))[0])
+
+
+def bench_frame(count=200, seed=0, size=(480, 640), locator=None) -> dict:
+    # ColorDetectorThread.run에서 분석하는 프레임 하나의 처리 : 검출, 투표, 오버레이, RGB 변환 (Qt 신호 제외)
+    engine = DetectionEngine(locator=locator)
+    votes = StickerVoteBuffer()
+    overlay = OverlayRenderer()
+    rgb = np.empty((*size, 3), dtype=np.uint8)
+
+    def step(frame):
+        result = engine.detect(frame)
+        votes.push(result.labels)
+        labels, stability = votes.vote()
+        overlay.compose(frame, result.roi, None, labels, stability, result.location)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+    return summarize(time_calls(step, _frames(count, size, seed)), unit='frames')
+
+
+def bench_frame_localized(count=200, seed=0, size=(480, 640)) -> dict:
+    return bench_frame(count, seed, size, CubeLocator())
+
+
+def bench_classify_pixel(count=20000, seed=0) -> dict:
+    # ColorUtils.get_color_name 한 번 = 픽셀 하나
+    pixels = [tuple(p) for p in np.random.default_rng(seed).integers(0, [180, 256, 256], (count, 3), dtype=np.uint8)]
+    COLOR_MODEL.snapshot().lookup(pixels[0])
+    return summarize(time_calls(ColorUtils.get_color_name, pixels, warmup=0), unit='pixels')
+
+
+def bench_classify_frame(count=50, seed=0, size=(480, 640)) -> dict:
+    # 프레임 전체 HSV 픽셀을 룩업 테이블로 한 번에 분류
+    rng = np.random.default_rng(seed)
+    frames = [rng.integers(0, [180, 256, 256], (*size, 3), dtype=np.uint8) for _ in range(count)]
+    return summarize(time_calls(COLOR_MODEL.snapshot().lookup, frames), size[0] * size[1], 'pixels')
+
+
+def bench_draw(count=200, seed=0) -> dict:
+    # 상태가 계속 바뀌므로 매번 바뀐 스티커를 다시 칠한다.
+    cube = Cube()
+    states = random_states(count, seed).to_strings()
+
+    def draw(cubestring):
+        cube.set_cube(cubestring)
+        cube.draw()
+    return summarize(time_calls(draw, states), unit='draws')
+
+
+def bench_is_valid(count=2000, seed=0) -> dict:
+    cubes = [Cube(cubestring) for cubestring in random_states(count, seed).to_strings()]
+    return summarize(time_calls(Cube.is_valid, cubes), unit='cubes')
+
+
+def bench_solve(count=50, seed=0) -> dict:
+    # 처음 호출의 pruning table 준비 시간은 빼고, 모두 캐시에 없는 새 상태로 잰다.
+    warm_up()
+    SOLUTION_CACHE.clear()
+    cubes = [Cube(cubestring) for cubestring in random_states(count, seed).to_strings()]
+    try:
+        return summarize(time_calls(Cube.solve, cubes, warmup=0), unit='cubes')
+    finally:
+        SOLUTION_CACHE.clear()
+
+
+def bench_startup(count=5, module='module.gui') -> dict:
+    # 새 인터프리터에서 module을 import 하는 데 걸리는 시간 (인터프리터 시작 포함)
+    command = [sys.executable, '-c', f'import {module}']
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+
+    def run(_):
+        subprocess.run(command, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return summarize(time_calls(run, list(range(count)), warmup=1), unit='starts')
+
+
+BENCHMARKS = {
+    'frame': bench_frame,
+    'frame_localized': bench_frame_localized,
+    'classify_pixel': bench_classify_pixel,
+    'classify_frame': bench_classify_frame,
+    'draw': bench_draw,
+    'is_valid': bench_is_valid,
+    'solve': bench_solve,
+    'startup': bench_startup,
+}
+
+
+def run_benchmarks(names=None, scale=1.0) -> dict:
+    # scale로 반복 횟수를 줄이거나 늘린다. (CI에서 빠르게 돌릴 때 0.1 등)
+    results = {}
+    for name in names or BENCHMARKS:
+        func = BENCHMARKS[name]
+        count = inspect.signature(func).parameters['count'].default
+        results[name] = func(count=max(2, int(count * scale)))
+        print(f"{name:16s} {_format(results[name])}", file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold=DEFAULT_THRESHOLD, metric='p50_ms') -> list[dict]:
+    # 기준 파일과 같은 이름의 벤치마크 중 metric이 (1 + threshold)배보다 커진 것들
+    regressions = []
+    for name, result in report['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if base is None or base[metric] <= 0:
+            continue
+        ratio = result[metric] / base[metric]
+        if ratio > 1 + threshold:
+            regressions.append({'name': name, 'metric': metric, 'baseline': base[metric], 'current': result[metric], 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def _format(result: dict) -> str:
+    return (f"p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms"
+            f"  {result['throughput']:12.1f} {result['throughput_unit']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run headless benchmarks and compare them with a saved baseline')
+    parser.add_argument('--only', help=f"comma separated benchmarks ({','.join(BENCHMARKS)})")
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the number of iterations (e.g. 0.1 for a quick run)')
+    parser.add_argument('-o', '--output', help='write the JSON report here (use it later as --baseline)')
+    parser.add_argument('--baseline', help='JSON report to compare against; exit with status 1 on regression')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown ratio (default: 0.25 = 25%%)')
+    parser.add_argument('--metric', choices=('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'), default='p50_ms')
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else None
+    unknown = set(names or ()) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+    report = run_benchmarks(names, args.scale)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(report, json.load(f), args.threshold, args.metric)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {r['metric']} {r['baseline']} -> {r['current']} ({r['ratio']}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
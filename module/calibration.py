@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+from . import color
+from .color import ColorUtils
+from .cubie import CENTERS, FACES, check_cube
+
+# Lab 거리에서 밝기 차이는 조명 영향이 크므로 덜 반영한다.
+LIGHTNESS_WEIGHT = 0.5
+# 군집 범위 바깥으로 더 허용하는 여유 (H, S, V)
+RANGE_MARGIN = (4, 30, 40)
+
+
+def hsv_features(hsv, space='lab') -> np.ndarray:
+    # (N, 3) HSV 샘플 -> 거리 계산용 특징 (N, 3)
+    hsv = np.asarray(hsv, dtype=np.uint8).reshape(-1, 1, 3)
+    if space == 'lab':
+        bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+        features = cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float32)
+        features[:, 0] *= LIGHTNESS_WEIGHT
+        return features
+    if space == 'hsv':
+        # Hue는 원형이므로 채도를 반지름으로 하는 원기둥 좌표로 바꾼다.
+        h, s, v = hsv.reshape(-1, 3).astype(np.float32).T
+        angle = h * (np.pi / 90)
+        return np.stack([s * np.cos(angle), s * np.sin(angle), v * LIGHTNESS_WEIGHT], axis=1)
+    raise ValueError(f"unknown color space '{space}'")
+
+
+def balanced_assign(distances: np.ndarray, anchors) -> np.ndarray:
+    # (54, 6) 거리에서 각 군집에 정확히 9개씩 배정한다. 센터(anchors[k])는 항상 k번 군집이고,
+    # 나머지는 거리가 가까운 (스티커, 군집) 쌍부터 자리가 남은 군집에 넣는다.
+    count, clusters = distances.shape
+    capacity = np.full(clusters, count // clusters)
+    labels = np.full(count, -1)
+    for k, anchor in enumerate(anchors):
+        labels[anchor] = k
+        capacity[k] -= 1
+    for flat in np.argsort(distances, axis=None, kind='stable'):
+        i, k = divmod(int(flat), clusters)
+        if labels[i] < 0 and capacity[k] > 0:
+            labels[i] = k
+            capacity[k] -= 1
+    return labels
+
+
+class CalibrationResult:
+    def __init__(self, cubestring: str, labels: np.ndarray, samples: np.ndarray, iterations: int) -> None:
+        self.cubestring = cubestring    # 군집으로 정한 facelet 문자열 (URFDLB)
+        self.labels = labels            # 스티커별 군집(면) 번호 (54,)
+        self.samples = samples          # 스티커별 HSV (54, 3)
+        self.iterations = iterations
+        self.valid, self.reason = check_cube(cubestring)
+        self.profile = self._profile()
+
+    def _profile(self) -> dict:
+        # 색상 이름 -> (main, min, max) HSV. 고정된 ±10/±50 대신 실제 군집의 퍼짐으로 범위를 정한다.
+        profile = {}
+        for k, face in enumerate(FACES):
+            members = self.samples[self.labels == k].astype(np.int64)
+            center = self.samples[CENTERS[k]].astype(np.int64)
+            # Hue는 센터 기준으로 -90~89 범위의 차이로 바꿔서 빨간색이 0/180 경계를 넘어도 이어지게 한다.
+            offsets = (members[:, 0] - center[0] + 90) % 180 - 90
+            main_h = int(center[0] + np.median(offsets)) % 180
+            main = (main_h, int(np.median(members[:, 1])), int(np.median(members[:, 2])))
+            h_min = int(center[0] + offsets.min()) - RANGE_MARGIN[0]
+            h_max = int(center[0] + offsets.max()) + RANGE_MARGIN[0]
+            if h_min >= 180:
+                h_min, h_max = h_min - 180, h_max - 180
+            low = [h_min, max(members[:, 1].min() - RANGE_MARGIN[1], 0), max(members[:, 2].min() - RANGE_MARGIN[2], 0)]
+            high = [h_max, min(members[:, 1].max() + RANGE_MARGIN[1], 255), min(members[:, 2].max() + RANGE_MARGIN[2], 255)]
+            color_name = ColorUtils.face_to_color(face)
+            if color_name == 'w':
+                # 흰색은 Hue가 의미 없으므로 채도와 밝기로만 구분한다.
+                low[0], high[0] = 0, 180
+            profile[color_name] = (main, tuple(int(x) for x in low), tuple(int(x) for x in high))
+        return profile
+
+    def apply(self):
+        # 계산한 여섯 색 범위를 새 스냅샷 하나로 한 번에 바꾼다. 룩업 테이블은 다음 분류 때 한 번 만들어진다.
+        return color.COLOR_MODEL.replace({
+            color_name: color.Color_HSV(main, low, high) for color_name, (main, low, high) in self.profile.items()
+        })
+
+
+def calibrate(samples, space='lab', max_iterations=10) -> CalibrationResult:
+    # 6면을 캡처한 54개 스티커의 HSV (URFDLB 순서)를 센터에 고정된 9개씩 6개 군집으로 나눈다.
+    samples = np.asarray(samples, dtype=np.uint8).reshape(54, 3)
+    features = hsv_features(samples, space)
+    centroids = features[list(CENTERS)]
+    labels = None
+    for iteration in range(1, max_iterations + 1):
+        distances = np.linalg.norm(features[:, None, :] - centroids[None, :, :], axis=2)
+        new_labels = balanced_assign(distances, CENTERS)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        centroids = np.stack([features[labels == k].mean(axis=0) for k in range(6)])
+    cubestring = "".join(FACES[k] for k in labels)
+    return CalibrationResult(cubestring, labels, samples, iteration)
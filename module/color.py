@@ -1,42 +1,50 @@
 import json
+import threading
+from types import MappingProxyType
+
 import numpy as np
 
+
 class Color_HSV:
+    # 색 하나의 대표 HSV와 범위. 만든 뒤에는 바뀌지 않고, 바꿀 때는 새 값을 만들어 ColorModel에 넣는다.
+    __slots__ = ('main_hsv', 'min_hsv', 'max_hsv')
+
     def __init__(self, hsv=None, min_hsv=None, max_hsv=None) -> None:
         if hsv is None and (min_hsv is None or max_hsv is None):
             raise ValueError("HSV or min_hsv and max_hsv should be given")
 
         if min_hsv is None:
-            min_hsv = (hsv[0] - 10, hsv[1] - 50, hsv[2] - 50)
-            self.min_hsv = np.clip(min_hsv, 0, 255)
-        else:
-            self.min_hsv = min_hsv
+            min_hsv = np.clip((hsv[0] - 10, hsv[1] - 50, hsv[2] - 50), 0, 255)
         if max_hsv is None:
-            max_hsv = (hsv[0] + 10, hsv[1] + 50, 255)
-            self.max_hsv = np.clip(max_hsv, 0, 255)
-        else:
-            self.max_hsv = max_hsv
- 
-        if hsv:
-            self.main_hsv = hsv
-        else:
-            self.main_hsv = (min_hsv[0] + 10, min_hsv[1] + 50, min_hsv[2] + 50)
+            max_hsv = np.clip((hsv[0] + 10, hsv[1] + 50, 255), 0, 255)
+        if hsv is None:
+            hsv = (min_hsv[0] + 10, min_hsv[1] + 50, min_hsv[2] + 50)
+        object.__setattr__(self, 'main_hsv', _hsv_tuple(hsv))
+        object.__setattr__(self, 'min_hsv', _hsv_tuple(min_hsv))
+        object.__setattr__(self, 'max_hsv', _hsv_tuple(max_hsv))
 
-    def update_hsv(self, hsv: tuple[int, int, int]):
-        self.main_hsv = hsv
-        self.min_hsv = np.clip((hsv[0] - 10, hsv[1] - 50, hsv[2] - 50), 0, 255)
-        self.max_hsv = np.clip((hsv[0] + 10, hsv[1] + 50, 255), 0, 255)
+    def __setattr__(self, name, value):
+        raise AttributeError("Color_HSV is immutable, use ColorModel to change colors")
 
-        print("Updated HSV:", self)
+    @classmethod
+    def from_main(cls, hsv) -> 'Color_HSV':
+        # 대표값 기준 ±10(H), ±50(S, V) 범위. Hue가 0 아래로 내려간 만큼은 180 근처로 이어지도록 음수로 남겨둔다.
+        h, s, v = (int(x) for x in hsv)
+        min_hsv = np.clip((h - 10, s - 50, v - 50), 0, 255)
+        if h - 10 < 0:
+            min_hsv[0] = h - 10
+        return cls((h, s, v), min_hsv, np.clip((h + 10, s + 50, 255), 0, 255))
 
-    def set_hsv(self, hsv):
-        self.main_hsv = hsv
+    def replace(self, hsv=None, min_hsv=None, max_hsv=None) -> 'Color_HSV':
+        return Color_HSV(self.main_hsv if hsv is None else hsv,
+                         self.min_hsv if min_hsv is None else min_hsv,
+                         self.max_hsv if max_hsv is None else max_hsv)
 
-    def set_min_hsv(self, min_hsv):
-        self.min_hsv = min_hsv
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Color_HSV) and (self.main_hsv, self.min_hsv, self.max_hsv) == (other.main_hsv, other.min_hsv, other.max_hsv)
 
-    def set_max_hsv(self, max_hsv):
-        self.max_hsv = max_hsv
+    def __hash__(self) -> int:
+        return hash((self.main_hsv, self.min_hsv, self.max_hsv))
 
     def __repr__(self) -> str:
         return str((self.min_hsv, self.max_hsv))
@@ -45,18 +53,209 @@ class Color_HSV:
         return f"Color_HSV(min : {self.min_hsv}, max : {self.max_hsv})\n main : {self.main_hsv}"
 
 
-COLORS = {
+def _hsv_tuple(hsv) -> tuple[int, int, int]:
+    return tuple(int(x) for x in hsv)
+
+
+# 룩업 테이블 값 -> 색상 이름. 0은 항상 unknown('u')
+COLOR_CODES = 'uorgbyw'
+
+class ColorLookupTable:
+    # H(0~179) x S(0~255) x V(0~255) 전체 공간에 대해 색상 코드를 미리 계산해두고,
+    # 픽셀은 인덱싱 한 번으로 분류한다. 색 범위 한 벌(ColorSnapshot)마다 한 번만 만든다.
+    def __init__(self, colors) -> None:
+        self.table = self.build(colors)
+
+    @classmethod
+    def build(cls, colors) -> np.ndarray:
+        table = np.zeros((180, 256, 256), dtype=np.uint8)
+        # colors 순서상 앞의 색이 우선이므로 뒤에서부터 덮어쓴다.
+        for color_name, color_hsv in reversed(list(colors.items())):
+            code = COLOR_CODES.index(color_name)
+            h_min, s_min, v_min = color_hsv.min_hsv
+            h_max, s_max, v_max = color_hsv.max_hsv
+            s_min, v_min = max(s_min, 0), max(v_min, 0)
+            if h_max < h_min or s_max < s_min or v_max < v_min:
+                continue
+            for h_lo, h_hi in cls._hue_ranges(h_min, h_max):
+                table[h_lo:h_hi + 1, s_min:s_max + 1, v_min:v_max + 1] = code
+        return table
+
+    @staticmethod
+    def _hue_ranges(h_min, h_max):
+        # 180을 넘거나 0보다 작은 구간은 반대편으로 넘어가는 빨간색 영역으로 처리
+        if h_max - h_min >= 179:
+            return [(0, 179)]
+        ranges = [(max(h_min, 0), min(h_max, 179))]
+        if h_max > 179:
+            ranges.append((0, h_max - 180))
+        if h_min < 0:
+            ranges.append((h_min + 180, 179))
+        return [(lo, hi) for lo, hi in ranges if lo <= hi]
+
+    def lookup(self, hsv) -> np.ndarray:
+        hsv = np.asarray(hsv)
+        if hsv.dtype != np.uint8:
+            hsv = np.clip(hsv, 0, 255).astype(np.intp)
+        h = np.minimum(hsv[..., 0], 179)
+        return self.table[h, hsv[..., 1], hsv[..., 2]]
+
+
+class ColorSnapshot:
+    # 어느 한 순간의 색 범위 전체. 바뀌지 않으므로 검출 스레드는 프레임 시작에 하나를 잡고 끝까지 그대로 쓴다.
+    # 룩업 테이블은 처음 분류할 때 한 번만 만든다. (두 스레드가 동시에 만들어도 결과가 같으므로 잠그지 않는다.)
+    __slots__ = ('version', 'colors', '_table')
+
+    def __init__(self, colors: dict, version: int, table=None) -> None:
+        self.version = version
+        self.colors = MappingProxyType(dict(colors))
+        self._table = table
+
+    @property
+    def table(self) -> ColorLookupTable:
+        table = self._table
+        if table is None:
+            table = self._table = ColorLookupTable(self.colors)
+        return table
+
+    def lookup(self, hsv) -> np.ndarray:
+        return self.table.lookup(hsv)
+
+    def __getitem__(self, color_name) -> Color_HSV:
+        return self.colors[color_name]
+
+    def items(self):
+        return self.colors.items()
+
+    def __repr__(self) -> str:
+        return f"ColorSnapshot(version={self.version}, {dict(self.colors)})"
+
+
+class ColorModel:
+    # 현재 ColorSnapshot 하나를 가리키고, 바꿀 때는 복사본을 만들어 참조만 통째로 바꾼다(copy-on-write).
+    # 읽는 쪽(검출 스레드)은 snapshot()으로 참조를 한 번 읽을 뿐 잠그지 않는다. 쓰는 쪽끼리만 잠근다.
+    def __init__(self, colors: dict) -> None:
+        self._write_lock = threading.Lock()
+        self._snapshot = ColorSnapshot(colors, 0)
+
+    def snapshot(self) -> ColorSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def replace(self, colors: dict) -> ColorSnapshot:
+        # 색 여러 개를 한 번에 바꾼다. 주지 않은 색은 그대로 두고, 순서(우선순위)도 유지한다.
+        with self._write_lock:
+            current = self._snapshot
+            merged = dict(current.colors)
+            merged.update(colors)
+            # 대표값만 바뀌고 범위가 그대로면 룩업 테이블은 이전 것을 같이 쓴다.
+            same_ranges = all((merged[name].min_hsv, merged[name].max_hsv) == (old.min_hsv, old.max_hsv)
+                              for name, old in current.colors.items())
+            self._snapshot = ColorSnapshot(merged, current.version + 1, current._table if same_ranges else None)
+            return self._snapshot
+
+    def set(self, color_name: str, color_hsv: Color_HSV) -> ColorSnapshot:
+        return self.replace({color_name: color_hsv})
+
+    def update_hsv(self, color_name: str, hsv) -> ColorSnapshot:
+        snapshot = self.set(color_name, Color_HSV.from_main(hsv))
+        print("Updated HSV:", snapshot[color_name])
+        return snapshot
+
+    def reset(self, colors: dict) -> ColorSnapshot:
+        # 순서까지 새로 정한다.
+        with self._write_lock:
+            self._snapshot = ColorSnapshot(colors, self._snapshot.version + 1)
+            return self._snapshot
+
+
+class ColorEntry:
+    # COLORS['r'] 처럼 이름으로 꺼낸 색. 읽을 때마다 현재 스냅샷의 값을 보고, 바꾸면 ColorModel에 새 스냅샷을 만든다.
+    def __init__(self, model: ColorModel, color_name: str) -> None:
+        self.model = model
+        self.color_name = color_name
+
+    @property
+    def value(self) -> Color_HSV:
+        return self.model.snapshot()[self.color_name]
+
+    @property
+    def main_hsv(self):
+        return self.value.main_hsv
+
+    @property
+    def min_hsv(self):
+        return self.value.min_hsv
+
+    @property
+    def max_hsv(self):
+        return self.value.max_hsv
+
+    def update_hsv(self, hsv: tuple[int, int, int]):
+        self.model.update_hsv(self.color_name, hsv)
+
+    def set_hsv(self, hsv):
+        self.model.set(self.color_name, self.value.replace(hsv=hsv))
+
+    def set_min_hsv(self, min_hsv):
+        self.model.set(self.color_name, self.value.replace(min_hsv=min_hsv))
+
+    def set_max_hsv(self, max_hsv):
+        self.model.set(self.color_name, self.value.replace(max_hsv=max_hsv))
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+class ColorsView:
+    # 예전 전역 dict COLORS와 같은 모양으로 쓰는 읽기 창. 값을 들고 있지 않으므로
+    # `from .color import COLORS`로 가져간 모듈도 reset_COLORS나 보정 이후의 색을 그대로 본다.
+    def __init__(self, model: ColorModel) -> None:
+        self.model = model
+
+    def __getitem__(self, color_name) -> ColorEntry:
+        self.model.snapshot()[color_name]
+        return ColorEntry(self.model, color_name)
+
+    def __contains__(self, color_name) -> bool:
+        return color_name in self.model.snapshot().colors
+
+    def __iter__(self):
+        return iter(self.model.snapshot().colors)
+
+    def __len__(self) -> int:
+        return len(self.model.snapshot().colors)
+
+    def keys(self):
+        return self.model.snapshot().colors.keys()
+
+    def items(self):
+        return self.model.snapshot().items()
+
+    def values(self):
+        return self.model.snapshot().colors.values()
+
+    def __repr__(self) -> str:
+        return repr(dict(self.model.snapshot().colors))
+
+
+COLOR_MODEL = ColorModel({
     'o': Color_HSV(min_hsv=(10, 100, 20), max_hsv=(25, 255, 255)),
     'r': Color_HSV(min_hsv=(0, 100, 100), max_hsv=(10, 255, 255)),
     'g': Color_HSV(min_hsv=(40, 50, 50), max_hsv=(90, 255, 255)),
     'b': Color_HSV(min_hsv=(100, 150, 0), max_hsv=(140, 255, 255)),
     'y': Color_HSV(min_hsv=(20, 100, 100), max_hsv=(30, 255, 255)),
     'w': Color_HSV(min_hsv=(0, 0, 50), max_hsv=(180, 50, 255)),
-}
+})
+COLORS = ColorsView(COLOR_MODEL)
 
 def standard_color_info_save(name: str):
-    global COLORS
-
     data = {}
 
     # JSON 파일이 이미 존재하면 기존 데이터를 로드
@@ -66,11 +265,8 @@ def standard_color_info_save(name: str):
     except FileNotFoundError:
         pass
 
-    # 현재 COLORS 데이터의 main_hsv 정보만 새로운 이름으로 저장
-    color_data = {
-        color_name: color_hsv.main_hsv.tolist() if isinstance(color_hsv.main_hsv, np.ndarray) else color_hsv.main_hsv
-        for color_name, color_hsv in COLORS.items()
-    }
+    # 현재 색 범위의 main_hsv 정보만 새로운 이름으로 저장
+    color_data = {color_name: list(color_hsv.main_hsv) for color_name, color_hsv in COLOR_MODEL.snapshot().items()}
     data[name] = color_data
 
     # JSON 파일에 저장
@@ -78,19 +274,19 @@ def standard_color_info_save(name: str):
         json.dump(data, f, indent=4)
 
 def standard_color_info_load(name: str):
-    global COLORS
-
     # JSON 파일에서 데이터를 로드
     try:
         with open('color_info.json', 'r') as f:
             data = json.load(f)
 
         if name in data:
+            # 여섯 색을 한 번에 바꿔서 검출 스레드가 반쯤 바뀐 색 범위를 보지 않게 한다.
             color_data = data[name]
-            for color_name, main_hsv in color_data.items():
-                if color_name in COLORS:
-                    COLORS[color_name].update_hsv(main_hsv)
-            print(f"Loaded color info for {name}:", COLORS)
+            snapshot = COLOR_MODEL.replace({
+                color_name: Color_HSV.from_main(main_hsv)
+                for color_name, main_hsv in color_data.items() if color_name in COLORS
+            })
+            print(f"Loaded color info for {name}:", snapshot)
         else:
             print(f"No color info found for {name}")
     except FileNotFoundError:
@@ -155,24 +351,25 @@ class ColorUtils:
     
     @staticmethod
     def get_color_name(hsv: tuple[int, int, int]):
-        for color_name, Color_hsv in COLORS.items():
-            lower = np.array(Color_hsv.min_hsv)
-            upper = np.array(Color_hsv.max_hsv)
-            if np.all(lower <= hsv) and np.all(hsv <= upper):
-                return color_name
-        return 'u'
+        return COLOR_CODES[COLOR_MODEL.snapshot().lookup(hsv)]
+
+    @staticmethod
+    def get_color_names(hsv_pixels) -> str:
+        # (..., 3) 모양의 HSV 픽셀들을 한 번에 분류해서 색상 문자열로 돌려준다.
+        codes = COLOR_MODEL.snapshot().lookup(hsv_pixels).ravel()
+        return "".join(COLOR_CODES[code] for code in codes)
     
     @staticmethod
     def color_string_to_face(color_string: str) -> str:
         return "".join([ColorUtils.color_to_face(color) for color in color_string])
 
 def reset_COLORS():
-    global COLORS
-    COLORS = {
+    # 전역 이름을 다시 묶지 않고 모델의 스냅샷만 바꾸므로 COLORS를 미리 import한 모듈도 바뀐 색을 본다.
+    COLOR_MODEL.reset({
         'r': Color_HSV(min_hsv=(0, 100, 100), max_hsv=(10, 255, 255)),
         'g': Color_HSV(min_hsv=(40, 50, 50), max_hsv=(90, 255, 255)),
         'b': Color_HSV(min_hsv=(100, 150, 0), max_hsv=(140, 255, 255)),
         'y': Color_HSV(min_hsv=(20, 100, 100), max_hsv=(30, 255, 255)),
         'w': Color_HSV(min_hsv=(0, 0, 50), max_hsv=(180, 50, 255)),
         'o': Color_HSV(min_hsv=(10, 100, 20), max_hsv=(25, 255, 255)),
-    }
\ No newline at end of file
+    })
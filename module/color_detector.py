@@ -1,128 +1,211 @@
+import threading
+import time
+
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QImage
 import cv2
 
-from .color import COLORS, ColorUtils
+from .calibration import calibrate
+from .color import COLOR_MODEL, ColorUtils
 from .cube import Cube
+from .cubie import FACES
+from .detection import DetectionEngine, open_source
+from .frame_pipeline import FrameBufferPool, LatestFrameGrabber, RateLimiter
+from .localization import CubeLocator
+from .metrics import METRICS
+from .overlay import OverlayRenderer
+from .stability import AutoCapture, StickerVoteBuffer
 
 # 색상이 unknown인 경우에는 캡쳐가 되지 않도록 해야한다.
 
 class ColorDetectorThread(QThread):
     color_detected = pyqtSignal(str, tuple)
-    frame_ready = pyqtSignal(QImage)
+    # 표시할 이미지와 그 번호. GUI는 그린 뒤 같은 번호로 frame_displayed를 호출한다.
+    frame_ready = pyqtSignal(int, QImage)
+    # 자동 캡처 : 안정된 면의 색상 문자열과 그 프레임의 스티커별 HSV (9, 3)를 GUI 스레드로 보낸다.
+    face_stable = pyqtSignal(str, object)
+    # frame_displayed를 기다리는 이미지를 이 개수까지만 붙잡아 둔다.
+    MAX_UNACKNOWLEDGED = 16
 
-    def __init__(self, cube):
+    def __init__(self, cube, patch_size=9, source=0, analysis_fps=15, display_fps=30, vote_history=8, auto_capture_frames=5, localize=False):
         super().__init__()
         self.capture_help_mode = False
         self.capture_order_list = []
         self.cube: Cube = cube
-        self.cap = cv2.VideoCapture(0)
+        # 카메라 번호, 동영상 파일, 이미지 폴더 모두 받을 수 있다.
+        self.cap = open_source(source)
+        # localize가 켜져 있으면 가운데 고정 ROI에 맞추지 않아도 화면에서 큐브를 찾아서 읽는다.
+        self.engine = DetectionEngine(patch_size, locator=CubeLocator() if localize else None)
+        self.overlay = OverlayRenderer()
         self.hsv = None
-        self.frame = None
+        self.face_info = ""
+        self.raw_face_info = ""
+        self.sticker_hsv = None
+        # 분석한 프레임마다 스티커 색을 투표해서 안정된 면(face_info)과 안정도를 만든다.
+        self.votes = StickerVoteBuffer(vote_history)
+        self.stability = None
+        # 투표 버퍼는 검출 스레드만 건드린다. 다른 스레드는 이 표시만 세우고 검출 스레드가 다음 분석 때 비운다.
+        self._reset_votes = False
+        # 키를 누르지 않아도 안정된 면을 캡처한다. 이미 캡처한 센터는 다시 캡처하지 않는다.
+        self.auto_capture = AutoCapture(auto_capture_frames)
+        self.auto_capture_enabled = False
+        self.captured_centers = set()
+        # 캡처한 면마다 9개 스티커의 HSV를 남겨두었다가 6면이 모이면 한꺼번에 자동 보정한다.
+        self.face_samples = {}
+        # 캡처, 분석, 화면 표시는 서로 다른 속도로 동작하고 각 단계에서 버린 프레임 수를 센다.
+        self.grabber = LatestFrameGrabber(self.cap)
+        # 화면으로 보내는 RGB 이미지 버퍼. GUI가 그리기를 마칠 때까지 다시 쓰지 않는다.
+        self.rgb_pool = FrameBufferPool(2)
+        self.analysis_limiter = RateLimiter(analysis_fps)
+        self.display_limiter = RateLimiter(display_fps)
+        self.display_dropped = 0
+        # frame_displayed가 이 시간(초) 안에 오지 않으면 기다리지 않고 다음 프레임을 표시한다.
+        self.display_timeout = 1.0
+        self.display_timeouts = 0
+        # 아래 상태는 검출 스레드와 GUI 스레드(frame_displayed)가 같이 바꾸므로 _display_lock 안에서만 다룬다.
+        # _shown : 보냈지만 아직 frame_displayed가 오지 않은 이미지 번호 -> RGB 버퍼 (시간이 지난 것도 늦게 오면 풀에 돌려준다)
+        # _pending_id : 그리기 완료를 기다리는 가장 최근 이미지 번호, 기다리지 않으면 None
+        self._display_lock = threading.Lock()
+        self._shown = {}
+        self._pending_id = None
+        self._pending_since = 0.0
+        self._next_display_id = 0
+        self._running = True
         print("WebCam is Opened:", self.cap.isOpened())
 
     def start_capture_help_mode(self):
         self.capture_help_mode = True
         self.capture_order_list = ["F", "R", "B", "L", "U", "D"]
         self.capture_order_list.reverse()
-
-        # 맨 처음에는 F면을 캡처하도록 현재 화면에 위쪽(노란색) 앞면(초록색) 아래(흰색)을 위치하도록 현재 프레임에 화살표를 그린다.
-        self.draw_help_arrow("F", self.frame)
-
-    def draw_help_arrow(self, current_center, frame):
-        cv2.putText(frame, f"Capture Helper Mode Activate Current Capture Color : {ColorUtils.get_long_color_name(ColorUtils.face_to_color(current_center))}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
-        if current_center == "F":
-            # U (Yellow)라는 글자가 roi의 위쪽에 위치하도록 한다.
-            cv2.putText(frame, "U (Yellow)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 - 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-            # F (Green)라는 글자가 roi의 중앙에 위치하도록 한다.
-            cv2.putText(frame, "F (Green)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 + 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            # D (White)라는 글자가 roi의 아래쪽에 위치하도록 한다.
-            cv2.putText(frame, "D (Down)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 + 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        elif current_center == "R":
-            # R이 정면에 위치하도록 화살표를 그린다. 좌에서 우로 가는 화살표를 그려야함
-            cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (255, 255, 0), 2)
-        elif current_center == "B":
-            # B가 정면에 위치하도록 화살표를 그린다. R의 경우와 같은 방향으로 화살표를 그려야함
-            cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (255, 255, 0), 2)
-        elif current_center == "L":
-            cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (255, 255, 0), 2)
-        elif current_center == "U":
-            # U가 정면에 위치하도록 화살표를 그린다. 왼쪽에서 오른쪽으로 가다가 중간에 위로 꺾는 화살표를 그려야함 총 2개를 그려야겠지.
-            cv2.arrowedLine(frame, (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2 + 50), (255, 255, 0), 2)
-            cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (255, 255, 0), 2)
-        elif current_center == "D":
-            # D가 정면에 위치하도록 화살표를 그린다. U의 경우와 같은 방향으로 화살표를 그려야함
-            cv2.arrowedLine(frame, (frame.shape[1] // 2, frame.shape[0] // 2 + 50), (frame.shape[1] // 2, frame.shape[0] // 2 - 50), (255, 255, 0), 2)
-
+        # 맨 처음에는 F면을 캡처하도록 다음 프레임부터 위쪽(노란색) 앞면(초록색) 아래(흰색)을 위치하도록 화살표를 그린다.
 
     def run(self):
         print("Thread is running")
-        while self.cap.isOpened():
-            ret, self.frame = self.cap.read()
-            if not ret:
-                break
-            # ROI 설정
-            height, width, _ = self.frame.shape
-            roi_size = min(height, width) // 2
-            roi_x = (width - roi_size) // 2
-            roi_y = (height - roi_size) // 2
-            roi = self.frame[roi_y:roi_y + roi_size, roi_x:roi_x + roi_size]
-            self.hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-            sub_roi_size = roi_size // 3
-            self.face_info = ""
-            for i in range(3):
-                for j in range(3):
-                    sub_x = j * sub_roi_size
-                    sub_y = i * sub_roi_size
-                    sub_roi = self.hsv[sub_y:sub_y + sub_roi_size, sub_x:sub_x + sub_roi_size]
-                    hsv_pixel = sub_roi[sub_roi_size // 2, sub_roi_size // 2]
-                    color_name = ColorUtils.get_color_name(hsv_pixel)
-                    color = ColorUtils.get_bgr_color(color_name)
-                    
-                    # 작은 ROI 그리기
-                    cv2.rectangle(roi, (sub_x, sub_y), (sub_x + sub_roi_size, sub_y + sub_roi_size), color, 2)
-                    
-                    # 작은 ROI 내부의 중앙에 색상을 검출하는 지점 가시화
-                    cv2.circle(roi, (sub_x + sub_roi_size // 2, sub_y + sub_roi_size // 2), 2, (0, 0, 0), -1)
-                    
-                    # 작은 ROI의 중앙 상단에 글씨 표시
-                    cv2.putText(roi, color_name, (sub_x + sub_roi_size // 2 - 8, sub_y + sub_roi_size // 2 - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
-                    
-                    self.face_info += color_name
-
-            self.frame[roi_y:roi_y + roi_size, roi_x:roi_x + roi_size] = roi
-
-            cv2.circle(self.frame, (width // 2, height // 2), 10, (255, 255, 255), 1)
-
-            if self.capture_help_mode:
-                self.draw_help_arrow(self.capture_order_list[-1], self.frame)
+        self.grabber.start()
+        result = None
+        while self._running:
+            item = self.grabber.get(timeout=0.5)
+            if item is None:
+                if self.grabber.finished:
+                    break
+                continue
+            _, frame = item
+            now = time.perf_counter()
+
+            # 색상 검출은 Qt와 무관한 DetectionEngine이 담당하고, 여기서는 화면 표시만 한다.
+            # 분석 주기가 아니면 직전 분석 결과를 그대로 표시한다.
+            if result is None or self.analysis_limiter.ready(now):
+                analysis_start = time.perf_counter()
+                result = self.engine.detect(frame)
+                self.hsv = result.hsv
+                self.sticker_hsv = result.samples
+                self.raw_face_info = result.labels
+                if self._reset_votes:
+                    self._reset_votes = False
+                    self.votes.reset()
+                self.votes.push(result.labels)
+                self.face_info, self.stability = self.votes.vote()
+                if self.auto_capture_enabled:
+                    expected = self.capture_order_list[-1] if self.capture_help_mode else None
+                    if self.auto_capture.update(self.face_info, self.stability, self.captured_centers, expected):
+                        self.face_stable.emit(self.face_info, result.samples.copy())
+                METRICS.since('analysis', analysis_start)
+
+            # 화면에 그릴 곳이 연결되어 있지 않으면(GUI 없이 쓸 때) 오버레이와 이미지 변환을 하지 않는다.
+            if not self.receivers(self.frame_ready):
+                self.grabber.release(frame)
+                continue
+            with self._display_lock:
+                # 그리기 완료가 너무 오래 오지 않으면 더 기다리지 않고 다음 프레임을 표시한다.
+                # 그 버퍼는 _shown에 남아 있다가 늦은 frame_displayed가 오면 풀로 돌아간다.
+                if self._pending_id is not None and now - self._pending_since > self.display_timeout:
+                    self._pending_id = None
+                    self.display_timeouts += 1
+                pending = self._pending_id is not None
+            # GUI가 이전 프레임을 아직 그리지 못했으면 이번 프레임은 표시하지 않는다.
+            if pending:
+                self.display_dropped += 1
+                self.grabber.release(frame)
+                continue
+            if not self.display_limiter.ready(now):
+                self.grabber.release(frame)
+                continue
+
+            start = time.perf_counter()
+            capture_step = self.capture_order_list[-1] if self.capture_help_mode else None
+            self.overlay.compose(frame, result.roi, capture_step, self.face_info, self.stability, result.location)
+            start = METRICS.since('overlay', start)
 
             # Qt에서 사용할 수 있는 이미지로 변환
-            rgb_image = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
+            # QImage는 버퍼를 복사하지 않고 감싸기만 하므로, GUI가 frame_displayed를 호출할 때까지 버퍼를 풀에 돌려주지 않는다.
+            rgb_image = self.rgb_pool.acquire(frame.shape)
+            rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_image)
+            self.grabber.release(frame)
             h, w, ch = rgb_image.shape
             bytes_per_line = ch * w
             qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+            METRICS.since('qimage', start)
 
-            self.frame_ready.emit(qt_image)
-            cv2.waitKey(1)
+            with self._display_lock:
+                self._next_display_id += 1
+                display_id = self._next_display_id
+                self._shown[display_id] = rgb_image
+                # 끝내 frame_displayed가 오지 않는 이미지가 쌓이지 않도록 가장 오래된 것부터 잊는다.
+                while len(self._shown) > self.MAX_UNACKNOWLEDGED:
+                    del self._shown[next(iter(self._shown))]
+                self._pending_id = display_id
+                self._pending_since = time.perf_counter()
+            self.frame_ready.emit(display_id, qt_image)
 
+        self.grabber.stop()
         self.cap.release()
-        cv2.destroyAllWindows()
+        print("Pipeline stats:", self.pipeline_stats())
+
+    def frame_displayed(self, display_id):
+        # GUI 스레드가 frame_ready로 받은 이미지를 화면에 그린(QPixmap으로 복사한) 뒤 그 번호로 호출한다.
+        with self._display_lock:
+            buffer = self._shown.pop(display_id, None)
+            if display_id == self._pending_id:
+                self._pending_id = None
+        self.rgb_pool.release(buffer)
 
-    def save_color_info(self) -> bool:
-        if len(self.face_info) != 9:
-            print("Face information is invalid length:", self.face_info)
+    def stop(self):
+        self._running = False
+        self.wait()
+
+    def pipeline_stats(self) -> dict:
+        return {
+            'grabbed': self.grabber.grabbed,
+            'grab_dropped': self.grabber.dropped,
+            'analyzed': self.analysis_limiter.passed,
+            'analysis_skipped': self.analysis_limiter.skipped,
+            'displayed': self.display_limiter.passed,
+            'display_rate_skipped': self.display_limiter.skipped,
+            'display_dropped': self.display_dropped,
+            'display_timeouts': self.display_timeouts,
+            'buffer_allocations': self.grabber.pool.allocations + self.rgb_pool.allocations,
+            'buffer_misses': self.grabber.pool.misses + self.rgb_pool.misses,
+        }
+
+    def save_color_info(self, face_info=None, samples=None) -> bool:
+        # face_info를 주지 않으면 지금 안정된 면을 캡처한다.
+        # samples는 그 면을 읽은 프레임의 스티커별 HSV이고, 주지 않으면 가장 최근 분석 결과를 쓴다.
+        if samples is None:
+            samples = self.sticker_hsv
+        face_info = face_info or self.face_info
+        if len(face_info) != 9:
+            print("Face information is invalid length:", face_info)
             return False
         
-        captured_face = ColorUtils.color_string_to_face(self.face_info)
+        captured_face = ColorUtils.color_string_to_face(face_info)
         center = captured_face[4]
 
-        print("captured face info:", self.face_info)
+        print("captured face info:", face_info)
         print("captured face:", captured_face)
         print("center:", center)
 
-        if "u" in self.face_info:
-            print("Face information is invalid color:", self.face_info)
+        if "u" in face_info:
+            print("Face information is invalid color:", face_info)
             return False
         
         if self.capture_help_mode:
@@ -139,13 +222,35 @@ class ColorDetectorThread(QThread):
             pass
 
         self.cube.updateFace(center, captured_face)
+        self.captured_centers.add(center)
+        if samples is not None:
+            self.face_samples[center] = samples.copy()
         return True
 
+    def reset_captures(self):
+        self.captured_centers.clear()
+        self.face_samples.clear()
+        self.auto_capture.reset()
+
+    def calibrate_colors(self, space='lab'):
+        # 6면의 스티커 54개를 센터 기준으로 9개씩 묶어 facelet 문자열과 새 색상 범위를 구한다. 6면이 안 모였으면 None
+        if any(face not in self.face_samples for face in FACES):
+            return None
+        return calibrate([self.face_samples[face] for face in FACES], space)
+
     def standard_color_update(self, color_name, hsv):
-        COLORS[color_name].update_hsv(hsv)
+        snapshot = COLOR_MODEL.update_hsv(color_name, hsv)
         print(f'{color_name} color updated to {hsv}')
-        print(f"Current COLORS MAP : {str(COLORS)}")
+        print(f"Current COLORS MAP : {snapshot}")
+
+    def set_patch_size(self, patch_size):
+        self.engine.sampler.patch_size = patch_size
+
+    def set_localize(self, enabled):
+        self.engine.locator = CubeLocator() if enabled else None
+        # 읽는 위치가 바뀌므로 이전 위치에서 모은 투표는 버린다.
+        self._reset_votes = True
 
     def get_captured_center_hsv(self):
-        return self.hsv[self.hsv.shape[0] // 2, self.hsv.shape[1] // 2]
+        return self.sticker_hsv[4]
 
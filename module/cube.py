@@ -1,10 +1,16 @@
+import time
+
 import cv2
-import numpy as np
 import kociemba
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QImage
 
 from .color import ColorUtils
+from .cube_renderer import CubeNetRenderer
+from .cube_state import CubeState
+from .cubie import check_cube
+from .metrics import METRICS
+from .solve_cache import SOLUTION_CACHE
 
 class Cube(QObject):
     # error_signal = pyqtSignal(str)
@@ -12,58 +18,41 @@ class Cube(QObject):
 
     def __init__(self, cube_str=None):
         super().__init__()
+        self.renderer = CubeNetRenderer()
         # default_cube = 'yyyyyyyyybbbbbbbbbrrrrrrrrrgggggggggooooooooowwwwwwwww'
         self.set_cube(cube_str)
         # self.draw()
 
     def set_cube(self, cube_str=None):
-        default_cube = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'
-        self.cube = {
-            'U': cube_str[:9] if cube_str else default_cube[:9],
-            'R': cube_str[9:18] if cube_str else default_cube[9:18],
-            'F': cube_str[18:27] if cube_str else default_cube[18:27],
-            'D': cube_str[27:36] if cube_str else default_cube[27:36],
-            'L': cube_str[36:45] if cube_str else default_cube[36:45],
-            'B': cube_str[45:] if cube_str else default_cube[45:]
-        }
+        # 큐브 상태는 CubeState 값으로 들고 있고, Cube는 그 위에서 그리기와 신호만 담당한다.
+        self.state = CubeState(cube_str or None)
 
     def reset(self):
         self.set_cube()
         self.draw()
 
     def _parse_face(self):
-        return ''.join([self.cube['U'], self.cube['R'], self.cube['F'], self.cube['D'], self.cube['L'], self.cube['B']])
-
-    def draw(self):
-        img_size = 512
-        square_size = img_size // 12
-        img = np.ones((img_size, img_size, 3), dtype=np.uint8) * 255
-
-        positions = {
-            'U': (square_size * 3, 0),
-            'L': (0, square_size * 3),
-            'F': (square_size * 3, square_size * 3),
-            'R': (square_size * 6, square_size * 3),
-            'B': (square_size * 9, square_size * 3),
-            'D': (square_size * 3, square_size * 6)
-        }
-
-        draw_face(img, self.cube['U'], *positions['U'], square_size)
-        draw_face(img, self.cube['D'], *positions['D'], square_size)
-        draw_face(img, self.cube['B'], *positions['B'], square_size)
-        draw_face(img, self.cube['F'], *positions['F'], square_size)
-        draw_face(img, self.cube['L'], *positions['L'], square_size)
-        draw_face(img, self.cube['R'], *positions['R'], square_size)
-
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return self.state.to_string()
+
+    def apply_moves(self, moves):
+        # kociemba 표기법의 회전(들)을 적용하고 다시 그린다.
+        self.state = self.state.apply(moves)
+        self.draw()
 
+    def draw(self, img_size=512):
+        # 전개도 이미지는 renderer가 들고 있고, 바뀐 스티커만 RGB로 바로 다시 칠한다.
+        if self.renderer.canvas.shape[0] != img_size:
+            self.renderer.resize(img_size)
+        img = self.renderer.render(self._parse_face())
+
+        # QImage는 버퍼를 감싸기만 하므로, renderer가 들고 있는 캔버스를 그대로 넘긴다.
         height, width, _ = img.shape
         bytes_per_line = 3 * width
         q_img = QImage(img.data, width, height, bytes_per_line, QImage.Format_RGB888)
         self.face_updated.emit(q_img)
 
     def updateFace(self, center, colors):
-        self.cube[center] = colors
+        self.state = self.state.with_face(center, colors)
         self.draw()
 
     def solve(self):
@@ -72,48 +61,19 @@ class Cube(QObject):
             print(f"from Cube.solve() {message}")
             return
         
-        cubestring = self._parse_face()
-        moves = kociemba.solve(cubestring)
-        return moves
+        # 구조 검사를 통과한 큐브만 kociemba로 넘기고, 이미 푼 상태는 캐시에서 꺼낸다.
+        with METRICS.measure('solve'):
+            return SOLUTION_CACHE.solve(self._parse_face())
 
     def is_valid(self) -> tuple[bool, str]:
-        try:
-            kociemba.solve(self._parse_face())
+        start = time.perf_counter()
+        result, reason = check_cube(self._parse_face())
+        METRICS.since('validate', start)
+        if result:
             return (True, "You Can Solve This Cube")
-        except ValueError as e:
-            e_str = str(e)
-            if "Probably" in e_str:
-                # self.error_signal.emit("This Cube is Invalid")
-                return (False, "This Cube is Invalid")
-            else:
-                # self.error_signal.emit(e_str)
-                return (False, e_str)
-
-
-def draw_face(img, faces, start_x, start_y, square_size):
-    for i in range(3):
-        for j in range(3):
-            index = i * 3 + j
-            face = faces[index]
-            cv2.rectangle(img, 
-                          (start_x + j * square_size, start_y + i * square_size), 
-                          (start_x + (j + 1) * square_size, start_y + (i + 1) * square_size), 
-                          colors_bgr[face], -1)
-            cv2.rectangle(img, 
-                          (start_x + j * square_size, start_y + i * square_size), 
-                          (start_x + (j + 1) * square_size, start_y + (i + 1) * square_size), 
-                          (0, 0, 0), 1)
-            if index == 4:
-                cv2.putText(img, face, (start_x + j * square_size + 10, start_y + i * square_size + 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-
-colors_bgr = {
-    'L': (0, 0, 255),  # Red
-    'F': (0, 255, 0),  # Green
-    'B': (255, 0, 0),  # Blue
-    'U': (0, 255, 255),  # Yellow
-    'D': (255, 255, 255),  # White
-    'R': (0, 165, 255)   # Orange
-}
+        # self.error_signal.emit("This Cube is Invalid")
+        return (False, f"This Cube is Invalid ({reason})")
+
 
 if __name__ == "__main__":
     cube = "wowgybwyogygybyoggrowbrgywrborwggybrbwororbwborgowryby"
@@ -0,0 +1,112 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .cube_state import IDENTITY, MOVE_NAMES, MOVES, CubeState, parse_moves, sequence_permutation
+
+# 회전 이름 -> MOVE_TABLE의 행 번호. 마지막 행은 아무것도 하지 않는 회전으로 길이가 다른 수순을 맞출 때 쓴다.
+MOVE_INDEX = {name: i for i, name in enumerate(MOVE_NAMES)}
+NO_MOVE = len(MOVE_NAMES)
+MOVE_TABLE = np.stack([MOVES[name] for name in MOVE_NAMES] + [IDENTITY])
+# 연속된 회전 CHUNK개를 미리 합쳐 둔 순열로 한 번에 적용한다.
+CHUNK = 3
+
+
+@lru_cache(maxsize=1)
+def chunk_table() -> np.ndarray:
+    # (19 ** CHUNK, 54) : 회전 번호 a, b, c를 차례로 적용한 순열이 a * 19 * 19 + b * 19 + c 행에 들어있다.
+    table = MOVE_TABLE
+    for _ in range(CHUNK - 1):
+        table = table[..., MOVE_TABLE]
+    return table.reshape(-1, 54).astype(np.int32)
+
+
+def encode_sequences(sequences) -> np.ndarray:
+    # 수순 N개를 (N, 최대 길이) 회전 번호 배열로 바꾼다. 짧은 수순은 NO_MOVE로 채운다.
+    rows = []
+    for moves in sequences:
+        names = moves.split() if isinstance(moves, str) else moves
+        try:
+            rows.append([MOVE_INDEX[name] for name in names])
+        except KeyError:
+            parse_moves(names)
+    length = max((len(row) for row in rows), default=0)
+    indices = np.full((len(rows), length), NO_MOVE, dtype=np.intp)
+    for i, row in enumerate(rows):
+        indices[i, :len(row)] = row
+    return indices
+
+
+def chunk_codes(indices: np.ndarray) -> np.ndarray:
+    # (N, L) 회전 번호를 CHUNK개씩 묶어 chunk_table의 행 번호 (N, ceil(L / CHUNK))로 바꾼다.
+    length = -(-indices.shape[1] // CHUNK) * CHUNK
+    padded = np.full((len(indices), length), NO_MOVE, dtype=np.intp)
+    padded[:, :indices.shape[1]] = indices
+    codes = np.zeros((len(indices), length // CHUNK), dtype=np.intp)
+    for k in range(CHUNK):
+        codes = codes * len(MOVE_TABLE) + padded[:, k::CHUNK]
+    return codes
+
+
+class CubeBatch:
+    # 큐브 N개를 (N, 54) uint8 배열 하나로 들고 있으면서 회전을 한꺼번에 적용한다.
+    __slots__ = ('facelets',)
+
+    def __init__(self, facelets) -> None:
+        facelets = np.asarray(facelets, dtype=np.uint8)
+        if facelets.ndim != 2 or facelets.shape[1] != 54:
+            raise ValueError(f"cube batch should have shape (N, 54), not {facelets.shape}")
+        self.facelets = facelets
+
+    @classmethod
+    def from_strings(cls, cubestrings) -> 'CubeBatch':
+        data = ''.join(cubestrings).encode('ascii')
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(-1, 54))
+
+    @classmethod
+    def from_states(cls, states) -> 'CubeBatch':
+        return cls(np.stack([state.facelets for state in states]))
+
+    def to_strings(self) -> list[str]:
+        data = self.facelets.tobytes().decode('ascii')
+        return [data[i:i + 54] for i in range(0, len(data), 54)]
+
+    def state(self, index: int) -> CubeState:
+        return CubeState(self.facelets[index].copy())
+
+    def __len__(self) -> int:
+        return len(self.facelets)
+
+    def apply(self, moves) -> 'CubeBatch':
+        # 모든 큐브에 같은 수순을 적용한다. 수순 전체를 순열 하나로 합쳐서 한 번만 섞는다.
+        return CubeBatch(self.facelets[:, sequence_permutation(moves)])
+
+    def apply_each(self, sequences) -> 'CubeBatch':
+        # 큐브마다 다른 수순을 적용한다. 회전 CHUNK개마다 큐브별 순열을 골라 (N, 54)를 한 번에 섞는다.
+        indices = sequences if isinstance(sequences, np.ndarray) else encode_sequences(sequences)
+        if len(indices) != len(self):
+            raise ValueError(f"{len(indices)} sequences for {len(self)} cubes")
+        table = chunk_table()
+        count = len(self)
+        # 큐브 n의 facelet j는 평탄화한 배열의 n * 54 + j 위치에 있다.
+        dtype = np.int32 if count * 54 < 2 ** 31 else np.intp
+        offsets = (np.arange(count, dtype=dtype) * 54)[:, None]
+        current = self.facelets.copy()
+        result = np.empty_like(current)
+        gather = np.empty((count, 54), dtype=dtype)
+        for step in chunk_codes(indices).T:
+            np.add(table[step], offsets, out=gather)
+            np.take(current.reshape(-1), gather, out=result)
+            current, result = result, current
+        return CubeBatch(current)
+
+    def is_solved(self) -> np.ndarray:
+        # (N,) bool : 각 면의 9칸이 모두 그 면의 가운데와 같은지
+        faces = self.facelets.reshape(-1, 6, 9)
+        return (faces == faces[:, :, 4:5]).all(axis=(1, 2))
+
+
+def verify_solutions(cubestrings, solutions) -> np.ndarray:
+    # 각 큐브에 해당 풀이를 적용했을 때 풀리지 않는 큐브의 번호를 돌려준다.
+    batch = CubeBatch.from_strings(cubestrings).apply_each(solutions)
+    return np.flatnonzero(~batch.is_solved())
@@ -0,0 +1,151 @@
+from math import factorial
+
+import numpy as np
+
+from .cube_batch import CubeBatch
+from .cube_state import CubeState
+from .cubie import CENTERS, CORNER_FACELETS, CORNER_NAMES, EDGE_FACELETS, EDGE_NAMES, FACES, CubeStateError
+from .scramble import cubie_to_facelets
+
+# 상태 하나를 9바이트로 저장한다.
+#   앞 4바이트 (big endian) : corner 순열 번호 (8! < 2^16) << 12 | corner 방향 (3^7 < 2^12)
+#   뒤 5바이트 (big endian) : edge 순열 번호 (12! < 2^29) << 11 | edge 방향 (2^11)
+# 마지막 코너/엣지의 방향은 나머지로부터 정해지므로 저장하지 않는다.
+RECORD_SIZE = 9
+
+_FACE_INDEX = np.full(256, 255, dtype=np.uint8)
+_FACE_INDEX[[ord(face) for face in FACES]] = np.arange(6)
+
+
+def _piece_table(names):
+    # 조각 자리의 facelet 색(면 번호)을 6진수로 묶은 값 -> (조각 번호, 방향). 없는 조합은 -1
+    size = len(names[0])
+    pieces = np.full(6 ** size, -1, dtype=np.int16)
+    orientations = np.full(6 ** size, -1, dtype=np.int16)
+    for piece, name in enumerate(names):
+        colors = [FACES.index(c) for c in name]
+        for ori in range(size):
+            # 방향이 ori이면 조각의 k번째 색이 자리의 (ori + k)번째 facelet에 있다.
+            placed = [colors[(k - ori) % size] for k in range(size)]
+            key = 0
+            for c in placed:
+                key = key * 6 + c
+            pieces[key] = piece
+            orientations[key] = ori
+    return pieces, orientations
+
+_CORNER_PIECES, _CORNER_ORIENTATIONS = _piece_table(CORNER_NAMES)
+_EDGE_PIECES, _EDGE_ORIENTATIONS = _piece_table(EDGE_NAMES)
+
+
+def _rank(perms: np.ndarray):
+    # (N, n) 순열의 사전식 순서 번호 (Lehmer code)와 뒤집힌 쌍 개수의 홀짝
+    n = perms.shape[1]
+    ranks = np.zeros(len(perms), dtype=np.int64)
+    inversions = np.zeros(len(perms), dtype=np.int64)
+    for i in range(n - 1):
+        smaller = (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+        ranks += smaller * factorial(n - 1 - i)
+        inversions += smaller
+    return ranks, inversions % 2
+
+
+def _unrank(ranks: np.ndarray, n: int) -> np.ndarray:
+    ranks = ranks.astype(np.int64)
+    remaining = np.tile(np.arange(n), (len(ranks), 1))
+    perms = np.empty((len(ranks), n), dtype=np.int64)
+    rows = np.arange(len(ranks))
+    for i in range(n):
+        digit, ranks = np.divmod(ranks, factorial(n - 1 - i))
+        perms[:, i] = remaining[rows, digit]
+        # 고른 숫자를 남은 목록에서 빼고 왼쪽으로 당긴다.
+        keep = np.arange(n - i)[None, :] != digit[:, None]
+        remaining = remaining[keep].reshape(len(ranks), n - i - 1)
+    return perms
+
+
+def _orientation_number(orientations: np.ndarray, modulus: int) -> np.ndarray:
+    number = np.zeros(len(orientations), dtype=np.int64)
+    for i in range(orientations.shape[1] - 1):
+        number = number * modulus + orientations[:, i]
+    return number
+
+
+def _orientation_digits(numbers: np.ndarray, size: int, modulus: int) -> np.ndarray:
+    orientations = np.empty((len(numbers), size), dtype=np.int64)
+    numbers = numbers.astype(np.int64)
+    for i in range(size - 2, -1, -1):
+        numbers, orientations[:, i] = np.divmod(numbers, modulus)
+    orientations[:, -1] = -orientations[:, :-1].sum(axis=1) % modulus
+    return orientations
+
+
+def _pieces(faces: np.ndarray, slots, piece_table, orientation_table):
+    key = np.zeros((len(faces), len(slots)), dtype=np.int64)
+    for k in range(len(slots[0])):
+        key = key * 6 + faces[:, [slot[k] for slot in slots]]
+    return piece_table[key].astype(np.int64), orientation_table[key].astype(np.int64)
+
+
+def _first_invalid(message, bad: np.ndarray):
+    if bad.any():
+        raise CubeStateError(f"{message} (cube {int(np.flatnonzero(bad)[0])})")
+
+
+def _face_numbers(facelets: np.ndarray) -> np.ndarray:
+    # facelet 문자 -> 그 색이 센터인 면 번호 (U R F D L B = 0..5)
+    faces = _FACE_INDEX[facelets]
+    standard = (faces[:, list(CENTERS)] == np.arange(6)).all(axis=1)
+    for row in np.flatnonzero(~standard):
+        # 색상 문자나 돌린 큐브처럼 센터가 U R F D L B가 아닌 경우만 따로 바꾼다.
+        centers = facelets[row, list(CENTERS)]
+        if len(set(centers.tolist())) != 6:
+            raise CubeStateError(f"centers are not unique (cube {int(row)})")
+        lookup = np.full(256, 255, dtype=np.uint8)
+        lookup[centers] = np.arange(6)
+        faces[row] = lookup[facelets[row]]
+    _first_invalid("unknown facelet", (faces == 255).any(axis=1))
+    return faces
+
+
+def encode_batch(batch: CubeBatch) -> np.ndarray:
+    # (N, 54) facelet -> (N, 9) uint8. 풀 수 있는 큐브만 받고 센터 색을 기준으로 면을 다시 붙인다.
+    faces = _face_numbers(batch.facelets)
+    cp, co = _pieces(faces, CORNER_FACELETS, _CORNER_PIECES, _CORNER_ORIENTATIONS)
+    ep, eo = _pieces(faces, EDGE_FACELETS, _EDGE_PIECES, _EDGE_ORIENTATIONS)
+    _first_invalid("impossible piece colors", (cp < 0).any(axis=1) | (ep < 0).any(axis=1))
+    _first_invalid("piece appears twice", (np.sort(cp, axis=1) != np.arange(8)).any(axis=1) | (np.sort(ep, axis=1) != np.arange(12)).any(axis=1))
+    _first_invalid("twisted corner or flipped edge", (co.sum(axis=1) % 3 != 0) | (eo.sum(axis=1) % 2 != 0))
+    cp_rank, cp_parity = _rank(cp)
+    ep_rank, ep_parity = _rank(ep)
+    _first_invalid("two pieces (corners or edges) swapped", cp_parity != ep_parity)
+
+    head = (cp_rank << 12 | _orientation_number(co, 3)).astype('>u4')
+    tail = (ep_rank << 11 | _orientation_number(eo, 2)).astype('>u8')
+    records = np.empty((len(faces), RECORD_SIZE), dtype=np.uint8)
+    records[:, :4] = head.view(np.uint8).reshape(-1, 4)
+    records[:, 4:] = tail.view(np.uint8).reshape(-1, 8)[:, 3:]
+    return records
+
+
+def decode_batch(records) -> CubeBatch:
+    # (N, 9) uint8 -> 센터가 U R F D L B인 (N, 54) facelet
+    records = np.asarray(records, dtype=np.uint8).reshape(-1, RECORD_SIZE)
+    head = np.ascontiguousarray(records[:, :4]).view('>u4').ravel().astype(np.int64)
+    tail_bytes = np.zeros((len(records), 8), dtype=np.uint8)
+    tail_bytes[:, 3:] = records[:, 4:]
+    tail = tail_bytes.view('>u8').ravel().astype(np.int64)
+
+    cp = _unrank(head >> 12, 8)
+    co = _orientation_digits(head & 0xFFF, 8, 3)
+    ep = _unrank(tail >> 11, 12)
+    eo = _orientation_digits(tail & 0x7FF, 12, 2)
+    return CubeBatch(cubie_to_facelets(cp, co, ep, eo))
+
+
+def encode_state(cubestring: str) -> bytes:
+    return encode_batch(CubeBatch.from_states([CubeState(cubestring)])).tobytes()
+
+
+def decode_state(record: bytes) -> str:
+    return decode_batch(np.frombuffer(record, dtype=np.uint8)).to_strings()[0]
@@ -0,0 +1,86 @@
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from .color import ColorUtils
+from .cubie import FACES
+
+# 면 문자 -> RGB 색상. 바로 RGB로 칠하므로 BGR 변환이 필요 없다.
+FACE_COLORS_RGB = np.array([ColorUtils.get_bgr_color(ColorUtils.face_to_color(face))[::-1] for face in FACES], dtype=np.uint8)
+_FACE_CODES = np.zeros(256, dtype=np.uint8)
+_FACE_CODES[[ord(face) for face in FACES]] = np.arange(len(FACES))
+
+# 전개도에서 각 면의 위치 (열, 행) 단위는 스티커 한 칸
+NET_POSITIONS = {
+    'U': (3, 0),
+    'L': (0, 3),
+    'F': (3, 3),
+    'R': (6, 3),
+    'B': (9, 3),
+    'D': (3, 6),
+}
+
+
+class CubeNetLayout:
+    # 이미지 크기별로 스티커 위치와 테두리만 그려진 바탕 이미지를 한 번만 만든다.
+    def __init__(self, img_size: int) -> None:
+        self.img_size = img_size
+        self.square_size = square_size = img_size // 12
+        # 스티커 내부 영역 (y0, y1, x0, x1). 테두리 1픽셀은 제외
+        rects = []
+        for face in FACES:
+            col, row = NET_POSITIONS[face]
+            for index in range(9):
+                x = (col + index % 3) * square_size
+                y = (row + index // 3) * square_size
+                rects.append((y + 1, y + square_size, x + 1, x + square_size))
+        self.rects = np.array(rects)
+
+        self.template = np.full((img_size, img_size, 3), 255, dtype=np.uint8)
+        self.sticker_map = np.full((img_size, img_size), -1, dtype=np.int16)
+        for i, (y0, y1, x0, x1) in enumerate(self.rects):
+            cv2.rectangle(self.template, (x0 - 1, y0 - 1), (x1, y1), (0, 0, 0), 1)
+            self.sticker_map[y0:y1, x0:x1] = i
+        self.sticker_pixels = np.nonzero(self.sticker_map >= 0)
+        self.sticker_of_pixel = self.sticker_map[self.sticker_pixels]
+
+
+@lru_cache(maxsize=8)
+def get_layout(img_size: int) -> CubeNetLayout:
+    return CubeNetLayout(img_size)
+
+
+class CubeNetRenderer:
+    # 전개도 이미지를 계속 들고 있다가 바뀐 스티커만 다시 칠한다.
+    def __init__(self, img_size=512) -> None:
+        self.canvas = None
+        self._layout = None
+        self._codes = None
+        self.resize(img_size)
+
+    def resize(self, img_size: int):
+        self._layout = get_layout(img_size)
+        self.canvas = self._layout.template.copy()
+        self._codes = None
+
+    def render(self, cubestring: str) -> np.ndarray:
+        layout = self._layout
+        codes = _FACE_CODES[np.frombuffer(cubestring.encode(), dtype=np.uint8)]
+        if self._codes is None:
+            # 처음에는 모든 스티커를 한 번에 칠한다.
+            self.canvas[layout.sticker_pixels] = FACE_COLORS_RGB[codes[layout.sticker_of_pixel]]
+            changed = np.arange(54)[4::9]
+        else:
+            changed = np.flatnonzero(codes != self._codes)
+            for i in changed:
+                y0, y1, x0, x1 = layout.rects[i]
+                self.canvas[y0:y1, x0:x1] = FACE_COLORS_RGB[codes[i]]
+        self._codes = codes
+
+        # 가운데 스티커에는 면 이름을 쓴다.
+        for i in changed:
+            if i % 9 == 4:
+                y0, _, x0, _ = layout.rects[i]
+                cv2.putText(self.canvas, cubestring[i], (x0 - 1 + 10, y0 - 1 + 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        return self.canvas
@@ -0,0 +1,110 @@
+import numpy as np
+
+from .cubie import FACES, CubeStateError
+from .facelet import FACE_NORMALS, POSITIONS, quarter_turn_matrix, rotation_permutation
+
+SOLVED_CUBE = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'
+IDENTITY = np.arange(54, dtype=np.intp)
+
+
+def _face_turn(face: str) -> np.ndarray:
+    # face 면에 붙어 있는 층(좌표가 면 방향으로 1인 조각)만 시계 방향으로 돌린다.
+    layer = (POSITIONS @ np.array(FACE_NORMALS[face])) == 1
+    return rotation_permutation(quarter_turn_matrix(face), layer).astype(np.intp)
+
+
+def compose(*perms) -> np.ndarray:
+    # 순서대로 적용한 것과 같은 순열 하나로 합친다. (new = old[perm])
+    result = IDENTITY
+    for perm in perms:
+        result = result[perm]
+    return result
+
+
+def _build_moves() -> dict:
+    moves = {}
+    for face in FACES:
+        turn = _face_turn(face)
+        moves[face] = turn
+        moves[face + '2'] = compose(turn, turn)
+        moves[face + "'"] = compose(turn, turn, turn)
+    return moves
+
+# kociemba 표기법의 18가지 회전 -> facelet 순열
+MOVES = _build_moves()
+MOVE_NAMES = list(MOVES)
+
+
+def parse_moves(moves) -> list[str]:
+    # "R U R' U2" 같은 문자열 또는 회전 이름 목록
+    names = moves.split() if isinstance(moves, str) else list(moves)
+    for name in names:
+        if name not in MOVES:
+            raise CubeStateError(f"unknown move '{name}'")
+    return names
+
+
+def sequence_permutation(moves) -> np.ndarray:
+    return compose(*(MOVES[name] for name in parse_moves(moves)))
+
+
+def invert_moves(moves) -> list[str]:
+    inverse = {'': "'", "'": '', '2': '2'}
+    return [name[0] + inverse[name[1:]] for name in reversed(parse_moves(moves))]
+
+
+class CubeState:
+    # 54칸 facelet 문자(ASCII 코드)를 uint8 배열로 들고 있는 값 타입. 회전하면 새 CubeState를 돌려준다.
+    # 문자를 그대로 저장하므로 'URFDLB' 표기와 색상 문자 표기 모두 담을 수 있고, 문자열 변환은 복사 한 번이다.
+    __slots__ = ('facelets',)
+
+    def __init__(self, facelets=None) -> None:
+        if facelets is None:
+            facelets = SOLVED_CUBE
+        if isinstance(facelets, str):
+            facelets = np.frombuffer(facelets.encode('ascii'), dtype=np.uint8)
+        facelets = np.asarray(facelets, dtype=np.uint8)
+        if facelets.shape != (54,):
+            raise CubeStateError(f"cube string should have 54 facelets, not {facelets.size}")
+        self.facelets = facelets
+
+    @classmethod
+    def from_string(cls, cubestring: str) -> 'CubeState':
+        return cls(cubestring)
+
+    def to_string(self) -> str:
+        return self.facelets.tobytes().decode('ascii')
+
+    def face(self, face: str) -> str:
+        start = FACES.index(face) * 9
+        return self.facelets[start:start + 9].tobytes().decode('ascii')
+
+    def with_face(self, face: str, colors: str) -> 'CubeState':
+        if len(colors) != 9:
+            raise CubeStateError(f"face {face} should have 9 facelets, not {len(colors)}")
+        facelets = self.facelets.copy()
+        start = FACES.index(face) * 9
+        facelets[start:start + 9] = np.frombuffer(colors.encode('ascii'), dtype=np.uint8)
+        return CubeState(facelets)
+
+    def apply(self, moves) -> 'CubeState':
+        if isinstance(moves, str) and moves in MOVES:
+            return CubeState(self.facelets[MOVES[moves]])
+        return CubeState(self.facelets[sequence_permutation(moves)])
+
+    def is_solved(self) -> bool:
+        # 각 면의 9칸이 모두 그 면의 가운데와 같은 색이면 풀린 상태
+        faces = self.facelets.reshape(6, 9)
+        return bool((faces == faces[:, 4:5]).all())
+
+    def __str__(self) -> str:
+        return self.to_string()
+
+    def __repr__(self) -> str:
+        return f"CubeState('{self.to_string()}')"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CubeState) and np.array_equal(self.facelets, other.facelets)
+
+    def __hash__(self) -> int:
+        return hash(self.facelets.tobytes())
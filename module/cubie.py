@@ -0,0 +1,106 @@
+FACES = 'URFDLB'
+CENTERS = (4, 13, 22, 31, 40, 49)
+
+CORNER_NAMES = ('URF', 'UFL', 'ULB', 'UBR', 'DFR', 'DLF', 'DBL', 'DRB')
+EDGE_NAMES = ('UR', 'UF', 'UL', 'UB', 'DR', 'DF', 'DL', 'DB', 'FR', 'FL', 'BL', 'BR')
+
+# kociemba facelet 번호 (U1=0 ... U9=8, R1=9 ... B9=53)
+CORNER_FACELETS = (
+    (8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+    (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51),
+)
+EDGE_FACELETS = (
+    (5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25),
+    (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14),
+)
+CORNER_COLORS = tuple(tuple(name) for name in CORNER_NAMES)
+EDGE_COLORS = tuple(tuple(name) for name in EDGE_NAMES)
+
+
+class CubeStateError(ValueError):
+    pass
+
+
+def normalize_centers(cubestring: str) -> str:
+    # 센터 색을 기준으로 각 면 문자를 U R F D L B로 다시 붙인다.
+    centers = [cubestring[i] for i in CENTERS]
+    if len(set(centers)) != 6:
+        raise CubeStateError(f"centers are not unique ({''.join(centers)})")
+    return cubestring.translate(str.maketrans(''.join(centers), FACES))
+
+
+def to_cubie(cubestring: str):
+    # facelet 문자열을 (corner 순열, corner 방향, edge 순열, edge 방향)으로 변환한다.
+    if len(cubestring) != 54:
+        raise CubeStateError(f"cube string should have 54 facelets, not {len(cubestring)}")
+    unknown = set(cubestring) - set(FACES)
+    if unknown:
+        raise CubeStateError(f"unknown facelet '{sorted(unknown)[0]}'")
+    for face in FACES:
+        count = cubestring.count(face)
+        if count != 9:
+            raise CubeStateError(f"facelet {face} appears {count} times")
+    facelets = normalize_centers(cubestring)
+
+    cp, co = [], []
+    for i, corner in enumerate(CORNER_FACELETS):
+        colors = [facelets[f] for f in corner]
+        ori = next((o for o in range(3) if colors[o] in 'UD'), None)
+        piece = None
+        if ori is not None:
+            key = (colors[ori], colors[(ori + 1) % 3], colors[(ori + 2) % 3])
+            piece = next((j for j, c in enumerate(CORNER_COLORS) if c == key), None)
+        if piece is None:
+            raise CubeStateError(f"corner {CORNER_NAMES[i]} has impossible colors {''.join(colors)}")
+        cp.append(piece)
+        co.append(ori)
+
+    ep, eo = [], []
+    for i, edge in enumerate(EDGE_FACELETS):
+        colors = (facelets[edge[0]], facelets[edge[1]])
+        if colors in EDGE_COLORS:
+            ep.append(EDGE_COLORS.index(colors))
+            eo.append(0)
+        elif colors[::-1] in EDGE_COLORS:
+            ep.append(EDGE_COLORS.index(colors[::-1]))
+            eo.append(1)
+        else:
+            raise CubeStateError(f"edge {EDGE_NAMES[i]} has impossible colors {''.join(colors)}")
+
+    return cp, co, ep, eo
+
+
+def permutation_parity(perm) -> int:
+    parity = 0
+    for i in range(len(perm)):
+        for j in range(i + 1, len(perm)):
+            if perm[i] > perm[j]:
+                parity ^= 1
+    return parity
+
+
+def check_cube(cubestring: str) -> tuple[bool, str]:
+    # kociemba 탐색 없이 구조만으로 풀 수 있는 큐브인지 검사한다.
+    try:
+        cp, co, ep, eo = to_cubie(cubestring)
+    except CubeStateError as e:
+        return (False, str(e))
+
+    for pieces, names, kind in ((cp, CORNER_NAMES, 'corner'), (ep, EDGE_NAMES, 'edge')):
+        seen = {}
+        for position, piece in enumerate(pieces):
+            if piece in seen:
+                return (False, f"{kind} {names[piece]} appears twice (at {names[seen[piece]]} and {names[position]})")
+            seen[piece] = position
+
+    # 방향의 합만 어긋나므로 어느 조각이 잘못 읽혔는지는 구조만으로 알 수 없다. 조각 이름은 알려주지 않는다.
+    twist = sum(co) % 3
+    if twist:
+        direction = 'clockwise' if twist == 1 else 'counter-clockwise'
+        return (False, f"one corner twisted {direction} (corner twist parity is off; the corner cannot be pinpointed)")
+    if sum(eo) % 2:
+        return (False, "one edge flipped (edge flip parity is off; the edge cannot be pinpointed)")
+    if permutation_parity(cp) != permutation_parity(ep):
+        # 코너 둘이 바뀌었는지 엣지 둘이 바뀌었는지는 구분할 수 없다.
+        return (False, "two pieces (corners or edges) swapped (permutation parity is off)")
+    return (True, "")
@@ -0,0 +1,201 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.color import COLOR_CODES, COLOR_MODEL, standard_color_info_load
+from module.localization import CubeLocator
+from module.metrics import METRICS
+from module.sampler import StickerSampler
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class DetectionResult:
+    def __init__(self, labels: str, confidences: np.ndarray, samples: np.ndarray, roi: tuple, hsv: np.ndarray, patches: np.ndarray, location=None, color_version=None) -> None:
+        self.labels = labels            # 9개 스티커 색상 ('rgbywo' 또는 'u')
+        self.confidences = confidences  # 패치 픽셀 중 같은 색으로 분류된 비율 (9,)
+        self.samples = samples          # 스티커별 대표 HSV (9, 3)
+        self.roi = roi                  # (x, y, size)
+        self.hsv = hsv                  # ROI의 HSV 이미지 (다음 detect 호출 때 덮어쓴다). 위치를 찾은 경우 격자를 둘러싼 사각형
+        self.patches = patches          # 스티커별로 모은 HSV 픽셀 (9, n, 3)
+        self.location = location        # 찾은 스티커 격자 (GridLocation), 고정 ROI를 썼으면 None
+        self.color_version = color_version  # 분류에 쓴 색 범위(ColorSnapshot)의 버전
+
+    def to_dict(self) -> dict:
+        result = {
+            'labels': self.labels,
+            'confidences': [round(float(c), 3) for c in self.confidences],
+            'samples': self.samples.tolist(),
+            'roi': list(self.roi),
+        }
+        if self.location is not None:
+            result['centers'] = np.round(self.location.centers.astype(np.float64), 1).tolist()
+            result['tracked'] = self.location.tracked
+        return result
+
+
+class DetectionEngine:
+    # Qt 없이 BGR 프레임 한 장에서 9개 스티커 색상과 신뢰도를 구한다.
+    # locator를 주면 화면 어디에 있든 스티커 격자를 찾아서 읽고, 못 찾은 프레임만 가운데 고정 ROI를 쓴다.
+    def __init__(self, patch_size=9, method='median', locator: CubeLocator = None) -> None:
+        self.sampler = StickerSampler(patch_size, method)
+        self.locator = locator
+        self._hsv = None
+
+    @staticmethod
+    def roi_rect(frame_shape) -> tuple[int, int, int]:
+        # 화면 가운데 정사각형 영역
+        height, width = frame_shape[:2]
+        roi_size = min(height, width) // 2
+        return (width - roi_size) // 2, (height - roi_size) // 2, roi_size
+
+    def detect(self, frame: np.ndarray) -> DetectionResult:
+        start = time.perf_counter()
+        # 프레임 하나는 처음에 잡은 색 범위 한 벌로만 분류한다. GUI가 도중에 색을 바꿔도 다음 프레임부터 반영된다.
+        colors = COLOR_MODEL.snapshot()
+        location = None
+        # GUI 스레드가 locator를 바꿀 수 있으므로 한 번만 읽어서 쓴다.
+        locator = self.locator
+        if locator is not None:
+            location = locator.locate(frame)
+            start = METRICS.since('localize', start)
+        if location is not None:
+            return self._detect_at(frame, location, colors, start)
+        roi_x, roi_y, roi_size = self.roi_rect(frame.shape)
+        hsv = self._to_hsv(frame[roi_y:roi_y + roi_size, roi_x:roi_x + roi_size])
+        start = METRICS.since('hsv', start)
+
+        return self._classify(self.sampler.patches(hsv), (roi_x, roi_y, roi_size), hsv, colors, start)
+
+    def _detect_at(self, frame: np.ndarray, location, colors, start) -> DetectionResult:
+        # 격자를 둘러싼 사각형만 HSV로 바꾸고 스티커 중심 주변 패치를 모은다. 패치는 스티커 간격의 절반을 넘지 않게 한다.
+        x0, y0, x1, y1 = location.bounding_rect(frame.shape)
+        hsv = self._to_hsv(frame[y0:y1, x0:x1])
+        start = METRICS.since('hsv', start)
+        patches = self.sampler.patches_at(hsv, location.centers - (x0, y0), int(location.pitch // 2))
+        return self._classify(patches, (x0, y0, max(x1 - x0, y1 - y0)), hsv, colors, start, location)
+
+    def _to_hsv(self, roi: np.ndarray) -> np.ndarray:
+        # 같은 크기의 HSV 버퍼를 계속 재사용한다.
+        if self._hsv is None or self._hsv.shape != roi.shape:
+            self._hsv = np.empty_like(roi)
+        return cv2.cvtColor(roi, cv2.COLOR_BGR2HSV, dst=self._hsv)
+
+    def _classify(self, patches, roi, hsv, colors, start, location=None) -> DetectionResult:
+        samples = self.sampler.reduce(patches)
+        codes = colors.lookup(samples)
+        pixel_codes = colors.lookup(patches)
+        confidences = (pixel_codes == codes[:, None]).mean(axis=1)
+
+        labels = "".join(COLOR_CODES[code] for code in codes)
+        METRICS.since('classify', start)
+        return DetectionResult(labels, confidences, samples, roi, hsv, patches, location, colors.version)
+
+
+# 프레임 입력원 : 모두 cv2.VideoCapture와 같은 isOpened / read / release 형태로 사용한다.
+
+class VideoCaptureSource:
+    # 카메라 번호 또는 동영상 파일
+    def __init__(self, target) -> None:
+        self.target = target
+        self.cap = cv2.VideoCapture(target)
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        # image를 주면 같은 크기인 경우 그 버퍼에 바로 읽는다.
+        if image is None:
+            return self.cap.read()
+        return self.cap.read(image)
+
+    def release(self):
+        self.cap.release()
+
+    def __iter__(self):
+        while self.isOpened():
+            ret, frame = self.read()
+            if not ret:
+                break
+            yield frame
+
+
+class ArraySource(VideoCaptureSource):
+    # 메모리에 있는 프레임 목록 또는 (N, H, W, 3) 배열
+    def __init__(self, frames) -> None:
+        self.target = 'array'
+        self.frames = iter(frames)
+        self.opened = True
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def read(self, image=None):
+        frame = next(self.frames, None)
+        if frame is None:
+            self.opened = False
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+
+class ImageDirectorySource(ArraySource):
+    # 폴더 안의 이미지들을 파일 이름 순서대로 읽는다.
+    def __init__(self, path) -> None:
+        self.paths = sorted(p for p in glob.glob(os.path.join(path, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+        images = (cv2.imread(p) for p in self.paths)
+        super().__init__(image for image in images if image is not None)
+        self.target = path
+
+
+def open_source(source):
+    if isinstance(source, (VideoCaptureSource, ArraySource)):
+        return source
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return VideoCaptureSource(int(source))
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageDirectorySource(source)
+    if isinstance(source, str):
+        return VideoCaptureSource(source)
+    return ArraySource(source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detect cube face colors without a display and print JSONL per frame')
+    parser.add_argument('source', help='camera index, video file or image folder')
+    parser.add_argument('--patch-size', type=int, default=9)
+    parser.add_argument('--method', choices=StickerSampler.METHODS, default='median')
+    parser.add_argument('--color-profile', help='name of a profile in color_info.json')
+    parser.add_argument('--localize', action='store_true', help='find the sticker grid anywhere in the frame instead of the centered square')
+    args = parser.parse_args(argv)
+
+    if args.color_profile:
+        # 결과는 stdout으로 내보내므로 불러오기 로그는 stderr로 보낸다.
+        with contextlib.redirect_stdout(sys.stderr):
+            standard_color_info_load(args.color_profile)
+    engine = DetectionEngine(args.patch_size, args.method, CubeLocator() if args.localize else None)
+    source = open_source(args.source)
+    try:
+        for index, frame in enumerate(source):
+            result = engine.detect(frame)
+            print(json.dumps({'frame': index, **result.to_dict()}))
+    finally:
+        source.release()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+
+from .cubie import FACES
+
+# 좌표계 : x는 R 방향, y는 U 방향, z는 F 방향. 큐브 조각 좌표는 -1, 0, 1
+FACE_NORMALS = {
+    'U': (0, 1, 0),
+    'R': (1, 0, 0),
+    'F': (0, 0, 1),
+    'D': (0, -1, 0),
+    'L': (-1, 0, 0),
+    'B': (0, 0, -1),
+}
+
+def _facelet_position(face, row, col):
+    # kociemba 전개도에서 각 면을 바깥에서 봤을 때의 (행, 열)을 3차원 좌표로 바꾼다.
+    return {
+        'U': (col - 1, 1, row - 1),
+        'R': (1, 1 - row, 1 - col),
+        'F': (col - 1, 1 - row, 1),
+        'D': (col - 1, -1, 1 - row),
+        'L': (-1, 1 - row, col - 1),
+        'B': (1 - col, 1 - row, -1),
+    }[face]
+
+POSITIONS = np.array([_facelet_position(face, i // 3, i % 3) for face in FACES for i in range(9)], dtype=np.int8)
+NORMALS = np.array([FACE_NORMALS[face] for face in FACES for _ in range(9)], dtype=np.int8)
+_FACELET_INDEX = {(tuple(p), tuple(n)): i for i, (p, n) in enumerate(zip(POSITIONS.tolist(), NORMALS.tolist()))}
+
+
+def quarter_turn_matrix(face: str) -> np.ndarray:
+    # face 면을 바깥에서 바라볼 때 시계 방향으로 90도 돌리는 회전 행렬
+    axis = np.array(FACE_NORMALS[face])
+    cross = np.array([
+        [0, -axis[2], axis[1]],
+        [axis[2], 0, -axis[0]],
+        [-axis[1], axis[0], 0],
+    ])
+    # Rodrigues 공식, 각도 -90도
+    return (np.outer(axis, axis) - cross).astype(np.int8)
+
+
+def rotation_permutation(matrix: np.ndarray, mask=None) -> np.ndarray:
+    # new_state = old_state[perm] 형태의 facelet 순열을 만든다.
+    perm = np.arange(54)
+    moved = POSITIONS @ matrix.T
+    turned = NORMALS @ matrix.T
+    for i in range(54) if mask is None else np.flatnonzero(mask):
+        j = _FACELET_INDEX[(tuple(moved[i].tolist()), tuple(turned[i].tolist()))]
+        perm[j] = i
+    return perm
+
+
+def _cube_rotations():
+    # x, y 회전을 조합해서 큐브 전체 회전 24가지를 모두 만든다.
+    generators = [quarter_turn_matrix('R'), quarter_turn_matrix('U')]
+    rotations = [np.eye(3, dtype=np.int8)]
+    seen = {rotations[0].tobytes()}
+    for matrix in rotations:
+        for generator in generators:
+            rotated = (generator @ matrix).astype(np.int8)
+            if rotated.tobytes() not in seen:
+                seen.add(rotated.tobytes())
+                rotations.append(rotated)
+    return rotations
+
+CUBE_ROTATIONS = _cube_rotations()
+ROTATION_PERMUTATIONS = [rotation_permutation(matrix) for matrix in CUBE_ROTATIONS]
+
+
+def rotation_face_map(matrix: np.ndarray) -> dict:
+    # 회전 후 Y 위치에 있는 면이 회전 전에는 어느 면(X)이었는지
+    faces_by_normal = {normal: face for face, normal in FACE_NORMALS.items()}
+    return {
+        face: faces_by_normal[tuple((matrix.T @ np.array(normal)).tolist())]
+        for face, normal in FACE_NORMALS.items()
+    }
+
+ROTATION_FACE_MAPS = [rotation_face_map(matrix) for matrix in CUBE_ROTATIONS]
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import numpy as np
+
+from .metrics import METRICS
+
+
+class FrameBufferPool:
+    # 해상도별로 미리 만들어 둔 버퍼를 돌려쓴다. 버퍼는 release로 돌려받기 전까지 다시 내주지 않는다.
+    def __init__(self, count=3) -> None:
+        self.count = count
+        self.allocations = 0
+        self.misses = 0         # 남은 버퍼가 없어서 호출한 쪽이 따로 할당해야 했던 횟수
+        self._lock = threading.Lock()
+        self._key = None
+        self._free = []
+        self._buffers = []
+
+    def acquire(self, shape, dtype=np.uint8):
+        # 남은 버퍼가 없으면 None
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            if key != self._key:
+                # 해상도가 바뀌면 이전 크기의 버퍼는 버린다.
+                self._key = key
+                self._free = []
+                self._buffers = []
+            if self._free:
+                return self._free.pop()
+            if len(self._buffers) >= self.count:
+                self.misses += 1
+                return None
+            self.allocations += 1
+            self._buffers.append(np.empty(shape, dtype=dtype))
+            return self._buffers[-1]
+
+    def release(self, buffer):
+        # 이 풀에서 만든 버퍼만 돌려받는다.
+        if buffer is None:
+            return
+        with self._lock:
+            if any(buffer is b for b in self._buffers):
+                self._free.append(buffer)
+
+
+class LatestFrameGrabber:
+    # 별도 스레드에서 프레임을 계속 읽고 한 칸짜리 슬롯에 가장 최근 프레임만 남긴다.
+    # 처리하는 쪽이 느려도 오래된 프레임이 쌓이지 않으므로 화면 지연이 늘어나지 않는다.
+    def __init__(self, source, pool=None) -> None:
+        self.source = source
+        self.pool = pool or FrameBufferPool()
+        self.grabbed = 0
+        self.dropped = 0        # 한 번도 읽히지 않고 새 프레임으로 덮어쓴 프레임 수
+        self.finished = False
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._taken_id = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        try:
+            shape = None
+            while self._running and self.source.isOpened():
+                # 이전 프레임과 같은 크기의 버퍼를 풀에서 받아 그 자리에 바로 읽는다.
+                buffer = self.pool.acquire(shape) if shape else None
+                start = time.perf_counter()
+                ret, frame = self.source.read(buffer)
+                METRICS.since('read', start)
+                if not ret:
+                    self.pool.release(buffer)
+                    break
+                if frame is not buffer:
+                    self.pool.release(buffer)
+                shape = frame.shape
+                with self._condition:
+                    if self._frame_id != self._taken_id:
+                        self.dropped += 1
+                        self.pool.release(self._frame)
+                    self._frame = frame
+                    self._frame_id += 1
+                    self.grabbed += 1
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self.finished = True
+                self._condition.notify_all()
+
+    def get(self, timeout=None):
+        # 아직 가져가지 않은 새 프레임을 기다렸다가 (frame_id, frame)을 돌려준다.
+        # 입력이 끝났거나 timeout이 지나면 None
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame_id != self._taken_id or self.finished, timeout)
+            if self._frame_id == self._taken_id:
+                return None
+            self._taken_id = self._frame_id
+            return self._frame_id, self._frame
+
+    def release(self, frame):
+        # get으로 받은 프레임을 다 쓴 뒤 풀에 돌려준다.
+        self.pool.release(frame)
+
+
+class RateLimiter:
+    # 주어진 fps보다 자주 호출되면 건너뛰도록 알려주고, 건너뛴 횟수를 센다.
+    def __init__(self, fps=None) -> None:
+        self.fps = fps
+        self.passed = 0
+        self.skipped = 0
+        self._last = None
+
+    def ready(self, now: float) -> bool:
+        if self.fps and self._last is not None and now - self._last < 1.0 / self.fps:
+            self.skipped += 1
+            return False
+        self._last = now
+        self.passed += 1
+        return True
@@ -1,16 +1,20 @@
 import json
 import os
 import sys
+import time
 import colorsys
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QMainWindow, QApplication, QLabel, QWidget, QSlider, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QLineEdit, QInputDialog, QMessageBox, QComboBox
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QMainWindow, QApplication, QLabel, QWidget, QSlider, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QLineEdit, QInputDialog, QMessageBox, QComboBox, QDoubleSpinBox, QSpinBox, QCheckBox
 from PyQt5.QtGui import QKeyEvent, QPixmap
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from module.color import Color_HSV, COLORS, ColorUtils, standard_color_info_load, standard_color_info_save
+from module.color import COLOR_MODEL, Color_HSV, ColorUtils, standard_color_info_load, standard_color_info_save
 from module.cube import Cube
+from module.metrics import METRICS, MetricsServer
 from module.color_detector import ColorDetectorThread
+from module.solve_cache import SOLUTION_CACHE
+from module.solver_worker import SolverThread
 
 class App(QMainWindow):
     def __init__(self, auto_detect=True):
@@ -26,12 +30,33 @@ class App(QMainWindow):
         self.color_detector_thread = ColorDetectorThread(self.cube)
         self.color_detector_thread.frame_ready.connect(self.update_video_frame)
         self.color_detector_thread.color_detected.connect(self.gui_update)
+        self.color_detector_thread.face_stable.connect(self.on_face_stable)
+        self.auto_capture_check.toggled.connect(self.toggled_auto_capture)
+        self.auto_capture_frames_spin.valueChanged.connect(self.changed_auto_capture_frames)
+        self.localize_check.toggled.connect(self.toggled_localize)
         if auto_detect:
             self.color_detector_thread.start()
 
             
         self.capture_help_button.clicked.connect(self.color_detector_thread.start_capture_help_mode)
 
+        # 풀이는 별도 스레드에서 진행해서 화면이 멈추지 않도록 한다.
+        self.solver_thread = SolverThread()
+        self.solver_thread.improved.connect(self.on_solve_improved)
+        self.solver_thread.solved.connect(self.on_solved)
+        self.solver_thread.failed.connect(self.on_solve_failed)
+        # 풀이를 맡는 자식 프로세스의 예열이 끝나면 상태를 표시한다.
+        self.solver_thread.ready.connect(self.on_solver_ready)
+        self.solver_thread.warm_up_failed.connect(self.on_solver_warm_up_failed)
+        self.solver_thread.start()
+
+        # 단계별 소요 시간 p95와 FPS를 상태 표시줄에 1초마다 보여준다. metrics_file이 있으면 같은 주기로 저장한다.
+        self.metrics_file = None
+        self.metrics_server = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        self.metrics_timer.start(1000)
+
 
     def init_UI(self):
         # 메인 위젯 생성
@@ -49,9 +74,17 @@ class App(QMainWindow):
         self.label = QLabel('Cube Color Detection Option Panel')
         self.leftLayout.addWidget(self.label)
 
+        self.solver_status_label = QLabel('Solver : warming up..')
+        self.leftLayout.addWidget(self.solver_status_label)
+
         self.capture_help_button = QPushButton('Capture Helper Start')
         self.leftLayout.addWidget(self.capture_help_button)
 
+        # 6면을 캡처한 뒤 54개 스티커를 한꺼번에 묶어서 큐브와 색상 범위를 다시 정한다.
+        self.auto_calibrate_button = QPushButton('Auto Calibrate (after 6 captures)')
+        self.auto_calibrate_button.clicked.connect(self.clicked_auto_calibrate)
+        self.leftLayout.addWidget(self.auto_calibrate_button)
+
         self.standard_combo = QComboBox()
         self.standard_combo_update()
         self.standard_combo.currentTextChanged.connect(self.combo_box_selection_changed)
@@ -60,12 +93,13 @@ class App(QMainWindow):
         self.color_load()
 
         # 슬라이더 추가
-        self.add_color_sliders('Red', COLORS['r'])
-        self.add_color_sliders('Green', COLORS['g'])
-        self.add_color_sliders('Blue', COLORS['b'])
-        self.add_color_sliders('Yellow', COLORS['y'])
-        self.add_color_sliders('White', COLORS['w'])
-        self.add_color_sliders('Orange', COLORS['o'])
+        colors = COLOR_MODEL.snapshot()
+        self.add_color_sliders('Red', colors['r'])
+        self.add_color_sliders('Green', colors['g'])
+        self.add_color_sliders('Blue', colors['b'])
+        self.add_color_sliders('Yellow', colors['y'])
+        self.add_color_sliders('White', colors['w'])
+        self.add_color_sliders('Orange', colors['o'])
 
         self.standard_color_info_save_button = QPushButton('Save Standard Color Info')
         self.leftLayout.addWidget(self.standard_color_info_save_button)
@@ -93,6 +127,20 @@ class App(QMainWindow):
         self.capture_button.clicked.connect(self.clicked_capture_button)
         self.video_layout.addWidget(self.capture_button)
 
+        # 자동 캡처 : 모든 스티커가 정해진 프레임 수만큼 안정되면 키를 누르지 않아도 캡처하고, 6면이 모이면 바로 푼다.
+        auto_capture_layout = QHBoxLayout()
+        self.auto_capture_check = QCheckBox('Auto Capture')
+        auto_capture_layout.addWidget(self.auto_capture_check)
+        auto_capture_layout.addWidget(QLabel('Stable Frames'))
+        self.auto_capture_frames_spin = QSpinBox()
+        self.auto_capture_frames_spin.setRange(1, 60)
+        self.auto_capture_frames_spin.setValue(5)
+        auto_capture_layout.addWidget(self.auto_capture_frames_spin)
+        # 큐브를 화면 가운데 사각형에 맞추지 않아도 스티커 격자를 찾아서 읽는다.
+        self.localize_check = QCheckBox('Localize Cube')
+        auto_capture_layout.addWidget(self.localize_check)
+        self.video_layout.addLayout(auto_capture_layout)
+
         # 큐브 해답 버튼 추가
         self.solve_button = QPushButton('Solve')
         self.solve_button.setMinimumHeight(50)
@@ -100,10 +148,30 @@ class App(QMainWindow):
         self.solve_button.clicked.connect(self.clicked_solve)
         self.video_layout.addWidget(self.solve_button)
 
+        # 시간 예산을 주면 그 시간 동안 더 짧은 풀이를 찾는다. (0이면 처음 찾은 풀이)
+        solve_option_layout = QHBoxLayout()
+        solve_option_layout.addWidget(QLabel('Time Budget (s)'))
+        self.solve_budget_spin = QDoubleSpinBox()
+        self.solve_budget_spin.setRange(0, 60)
+        self.solve_budget_spin.setSingleStep(0.5)
+        solve_option_layout.addWidget(self.solve_budget_spin)
+        solve_option_layout.addWidget(QLabel('Target Moves'))
+        self.solve_target_spin = QSpinBox()
+        self.solve_target_spin.setRange(0, 24)
+        self.solve_target_spin.setSpecialValueText('None')
+        solve_option_layout.addWidget(self.solve_target_spin)
+        self.video_layout.addLayout(solve_option_layout)
+
         self.cube_view = QLabel()
         self.cube_view.setMinimumSize(512, 512)
         self.rightLayout.addWidget(self.cube_view)
 
+    def on_solver_ready(self, seconds):
+        self.solver_status_label.setText(f'Solver : ready (warm-up {seconds:.3f}s)')
+
+    def on_solver_warm_up_failed(self, message):
+        self.solver_status_label.setText(f'Solver : warm-up failed ({message})')
+
     def keyPressEvent(self, a0: QKeyEvent | None) -> None:
         key = a0.key()
         if key == Qt.Key_S:
@@ -116,7 +184,9 @@ class App(QMainWindow):
             super().keyPressEvent(a0)
 
     def pressed_Key_R(self):
+        self.solver_thread.cancel()
         self.cube.reset()
+        self.color_detector_thread.reset_captures()
         self.solve_moves_label.setText('Cube Reset.. Capture Again..')
         self.solve_button.setEnabled(False)
 
@@ -140,7 +210,7 @@ class App(QMainWindow):
     def combo_box_selection_changed(self, name: str):
         if name and name != "No data available":
             standard_color_info_load(name)
-            for color_name, color_hsv in COLORS.items():
+            for color_name, color_hsv in COLOR_MODEL.snapshot().items():
                 self.gui_update(ColorUtils.get_long_color_name(color_name), color_hsv.main_hsv)
 
     def standard_color_info_save_button_clicked(self):
@@ -235,24 +305,47 @@ class App(QMainWindow):
         v = val_slider.value()
 
         print(f'{color_name} color updated to ({h}, {s}, {v})')
-        current_color = COLORS[ColorUtils.get_short_color_name(color_name)]
-        current_color.update_hsv((h, s, v))
+        # 새 스냅샷으로 통째로 바꾸므로 검출 스레드는 프레임 중간에 반쯤 바뀐 색을 보지 않는다.
+        COLOR_MODEL.update_hsv(ColorUtils.get_short_color_name(color_name), (h, s, v))
 
         color_display.setStyleSheet(f'background-color: {self.hsv_to_rgb_css((h, s, v))}')
         value_label.setText(f'({h}, {s}, {v})')
 
     def clicked_solve(self):
         print("Solve Button Clicked")
-        try:
-            moves = self.cube.solve()
-            print(f'해답 : {moves}')
-            self.solve_moves_label.setText(f'Solve Moves : {moves}')
-        except ValueError as e:
-            self.solve_moves_label.setText(f'{str(e)}')
+        result, msg = self.cube.is_valid()
+        if not result:
+            self.solve_moves_label.setText(msg)
+            return
+        budget = self.solve_budget_spin.value() or None
+        target = self.solve_target_spin.value() or None
+        self.solver_thread.request(self.cube._parse_face(), budget, target)
+        self.solve_moves_label.setText('Solving..')
+
+    def on_solve_improved(self, request_id, moves, elapsed):
+        if not self.solver_thread.is_current(request_id):
+            return
+        self.solve_moves_label.setText(f'Solve Moves ({len(moves.split())}, searching..) : {moves} ({elapsed:.3f}s)')
+
+    def on_solved(self, request_id, moves, elapsed):
+        if not self.solver_thread.is_current(request_id):
+            return
+        print(f'해답 : {moves} ({elapsed:.3f}s)')
+        self.solve_moves_label.setText(f'Solve Moves ({len(moves.split())}) : {moves} ({elapsed:.3f}s)')
+
+    def on_solve_failed(self, request_id, message, elapsed):
+        if not self.solver_thread.is_current(request_id):
+            return
+        self.solve_moves_label.setText(message)
 
     def clicked_capture_button(self):
-        issaved = self.color_detector_thread.save_color_info()
+        self.capture_face()
+
+    def capture_face(self, face_info=None, samples=None):
+        issaved = self.color_detector_thread.save_color_info(face_info, samples)
         if issaved:
+            # 큐브가 바뀌었으므로 이전 상태에 대한 풀이는 버린다.
+            self.solver_thread.cancel()
             result, msg = self.cube.is_valid()
             if result:
                 self.solve_button.setEnabled(True)
@@ -261,7 +354,48 @@ class App(QMainWindow):
             self.solve_moves_label.setText(msg)
         else:
             self.solve_moves_label.setText('Capture Failed.. Try Again.. unknown color detected..')
-    
+        return issaved
+
+    def toggled_auto_capture(self, checked):
+        self.color_detector_thread.auto_capture.reset()
+        self.color_detector_thread.auto_capture_enabled = checked
+
+    def toggled_localize(self, checked):
+        self.color_detector_thread.set_localize(checked)
+
+    def changed_auto_capture_frames(self, frames):
+        self.color_detector_thread.auto_capture.frames = frames
+
+    def on_face_stable(self, face_info, samples):
+        # 보정에는 이 핸들러가 불릴 때의 최신 프레임이 아니라 안정되었다고 판단한 프레임의 스티커 값을 쓴다.
+        if not self.color_detector_thread.auto_capture_enabled or not self.capture_face(face_info, samples):
+            return
+        captured = len(self.color_detector_thread.captured_centers)
+        print(f"Auto captured {face_info} ({captured}/6)")
+        # 여섯 번째 면이 들어오면 바로 검사하고 푼다.
+        if captured == 6:
+            self.clicked_solve()
+        else:
+            self.solve_moves_label.setText(f'Auto Capture ({captured}/6) : {self.solve_moves_label.text()}')
+
+    def clicked_auto_calibrate(self):
+        result = self.color_detector_thread.calibrate_colors()
+        if result is None:
+            captured = len(self.color_detector_thread.face_samples)
+            self.solve_moves_label.setText(f'Auto Calibrate needs all 6 faces captured ({captured}/6)')
+            return
+        print(f"Auto calibrated in {result.iterations} iterations: {result.cubestring} {result.profile}")
+        result.apply()
+        for color_name, (main, _, _) in result.profile.items():
+            self.gui_update(ColorUtils.get_long_color_name(color_name), main)
+
+        self.solver_thread.cancel()
+        self.cube.set_cube(result.cubestring)
+        self.cube.draw()
+        self.solve_button.setEnabled(result.valid)
+        _, msg = self.cube.is_valid()
+        self.solve_moves_label.setText(f'Auto Calibrated : {msg}')
+
     def gui_update(self, color_name, hsv):
         h_slider: QSlider = self.sliders[color_name]['hue_slider']
         s_slider: QSlider = self.sliders[color_name]['sat_slider']
@@ -269,9 +403,11 @@ class App(QMainWindow):
         color_display: QLabel = self.sliders[color_name]['color_display']
         value_label: QLabel = self.sliders[color_name]['value_label']
 
-        h_slider.setValue(hsv[0])
-        s_slider.setValue(hsv[1])
-        v_slider.setValue(hsv[2])
+        # 슬라이더 값만 맞추고, 이미 정해진 색상 범위를 슬라이더 이벤트로 다시 덮어쓰지 않는다.
+        for slider, value in ((h_slider, hsv[0]), (s_slider, hsv[1]), (v_slider, hsv[2])):
+            slider.blockSignals(True)
+            slider.setValue(int(value))
+            slider.blockSignals(False)
         color_display.setStyleSheet(f'background-color: {self.hsv_to_rgb_css(hsv)}')
         value_label.setText(f'({hsv[0]}, {hsv[1]}, {hsv[2]})')
 
@@ -280,17 +416,58 @@ class App(QMainWindow):
 
         self.gui_update(color_name, hsv)
 
-        COLORS[ColorUtils.get_short_color_name(color_name)].update_hsv(hsv)
+        snapshot = COLOR_MODEL.update_hsv(ColorUtils.get_short_color_name(color_name), hsv)
 
         print(f'{color_name} color updated to {hsv}')
-        print(f"Current COLORS MAP : {str(COLORS)}")
+        print(f"Current COLORS MAP : {snapshot}")
 
-    def update_video_frame(self, qt_img):
+    def update_video_frame(self, display_id, qt_img):
+        start = time.perf_counter()
         self.video_frame.setPixmap(QPixmap.fromImage(qt_img))
-
-def start(auto_detect=True):
+        METRICS.since('pixmap', start)
+        self.color_detector_thread.frame_displayed(display_id)
+
+    def update_metrics(self):
+        self.statusBar().showMessage(METRICS.status_text(['read', 'localize', 'hsv', 'classify', 'overlay', 'qimage', 'pixmap', 'solve', 'validate']))
+        if self.metrics_file:
+            METRICS.dump(self.metrics_file)
+
+    def closeEvent(self, a0) -> None:
+        self.color_detector_thread.stop()
+        self.solver_thread.stop()
+        if SOLUTION_CACHE.path:
+            SOLUTION_CACHE.save()
+            print("Solution cache saved:", SOLUTION_CACHE.stats())
+        if self.metrics_file:
+            METRICS.dump(self.metrics_file)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        super().closeEvent(a0)
+
+def start(auto_detect=True, solution_cache_path=None, metrics_file=None, metrics_port=None):
+    # solution_cache_path를 주면 풀이 캐시를 실행 사이에 파일로 유지한다.
+    # metrics_file을 주면 단계별 소요 시간을 1초마다 JSON으로 저장하고,
+    # metrics_port를 주면 http://127.0.0.1:<port>/metrics 로 모니터링 도구가 가져갈 수 있게 한다.
+    # (환경 변수 R3_METRICS_FILE, R3_METRICS_PORT로도 켤 수 있다.)
+    metrics_file = metrics_file or os.environ.get('R3_METRICS_FILE')
+    metrics_port = metrics_port or os.environ.get('R3_METRICS_PORT')
+    metrics_server = None
+    if metrics_port:
+        # 포트를 쓸 수 없어도 GUI는 띄우고 엔드포인트만 끈다.
+        try:
+            metrics_server = MetricsServer(METRICS, int(metrics_port)).start()
+            print(f"Metrics endpoint: http://127.0.0.1:{metrics_server.port}/metrics")
+        except (OSError, ValueError) as e:
+            print(f"Metrics endpoint disabled ({metrics_port}): {e}")
+    if solution_cache_path:
+        SOLUTION_CACHE.path = solution_cache_path
+        if os.path.exists(solution_cache_path):
+            SOLUTION_CACHE.load()
     app = QApplication(sys.argv)
     main_window = App(auto_detect)
+    main_window.metrics_file = metrics_file
+    main_window.metrics_server = metrics_server
     main_window.show()
     sys.exit(app.exec_())
 
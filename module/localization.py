@@ -0,0 +1,173 @@
+import math
+
+import cv2
+import numpy as np
+
+# 3x3 격자에서 스티커 중심의 (열, 행) 번호와 바깥 모서리 (왼쪽 위부터 시계 방향)
+GRID_CELLS = np.array([(i % 3, i // 3) for i in range(9)], dtype=np.float32)
+GRID_CORNERS = np.array([(-0.5, -0.5), (2.5, -0.5), (2.5, 2.5), (-0.5, 2.5)], dtype=np.float32)
+
+
+class GridLocation:
+    def __init__(self, centers: np.ndarray, corners: np.ndarray, pitch: float, tracked=False) -> None:
+        self.centers = centers      # (9, 2) 스티커 중심 (x, y), 원본 해상도, 왼쪽 위부터 행 순서
+        self.corners = corners      # (4, 2) 면 전체의 사각형
+        self.pitch = pitch          # 이웃한 스티커 중심 사이 거리 (픽셀)
+        self.tracked = tracked      # 이전 위치 주변만 찾아서 얻은 결과인지
+
+    def bounding_rect(self, shape, margin=0.0) -> tuple[int, int, int, int]:
+        # (x0, y0, x1, y1), 프레임 안으로 자른다.
+        pad = margin * self.pitch
+        x0, y0 = np.floor(self.corners.min(axis=0) - pad).astype(int)
+        x1, y1 = np.ceil(self.corners.max(axis=0) + pad).astype(int)
+        return max(int(x0), 0), max(int(y0), 0), min(int(x1), shape[1]), min(int(y1), shape[0])
+
+    def cell_quads(self) -> np.ndarray:
+        # (9, 4, 2) 스티커 칸마다의 사각형 (왼쪽 위부터 시계 방향)
+        step_x = (self.corners[1] - self.corners[0]) / 3
+        step_y = (self.corners[3] - self.corners[0]) / 3
+        quads = np.array([(-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)], dtype=np.float32)
+        offsets = quads[:, :1] * step_x + quads[:, 1:] * step_y
+        return self.centers[:, None, :] + offsets[None]
+
+    def shifted(self, dx, dy, scale=1.0) -> 'GridLocation':
+        offset = np.array([dx, dy], dtype=np.float32)
+        return GridLocation(self.centers * scale + offset, self.corners * scale + offset, self.pitch * scale, self.tracked)
+
+
+def find_sticker_squares(gray: np.ndarray, min_side=6):
+    # 엣지로 둘러싸인 볼록한 사각형 중 정사각형에 가까운 것을 스티커 후보로 본다.
+    # (중심 (n, 2), 한 변 길이 (n,), 기울기 (n,) -45도 ~ 45도)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), 30, 90)
+    edges = cv2.dilate(edges, np.ones((2, 2), dtype=np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    max_side = min(gray.shape[:2]) / 3
+    centers, sides, angles = [], [], []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < min_side * min_side or area > max_side * max_side:
+            continue
+        approx = cv2.approxPolyDP(contour, 0.08 * cv2.arcLength(contour, True), True)
+        if len(approx) != 4 or not cv2.isContourConvex(approx):
+            continue
+        # 꼭짓점이 4개뿐이므로 numpy 대신 파이썬 수식으로 계산하는 편이 빠르다.
+        points = approx.reshape(4, 2).tolist()
+        vectors = [(x1 - x0, y1 - y0) for (x0, y0), (x1, y1) in zip(points[-1:] + points[:-1], points)]
+        lengths = [math.hypot(dx, dy) for dx, dy in vectors]
+        if min(lengths) < 0.7 * max(lengths):
+            continue
+        side = sum(lengths) / 4
+        cx = sum(x for x, _ in points) / 4
+        cy = sum(y for _, y in points) / 4
+        # 엣지 선의 안쪽과 바깥쪽 윤곽이 둘 다 잡히므로 거의 같은 자리의 후보는 하나만 남긴다.
+        if any(abs(cx - x) + abs(cy - y) < 0.3 * side for x, y in centers):
+            continue
+        # 네 변의 방향을 90도 주기로 평균내서 기울기를 구한다.
+        turn = [4 * math.atan2(dy, dx) for dx, dy in vectors]
+        centers.append((cx, cy))
+        sides.append(side)
+        angles.append(math.atan2(sum(map(math.sin, turn)), sum(map(math.cos, turn))) / 4)
+    return np.array(centers, dtype=np.float32).reshape(-1, 2), np.array(sides, dtype=np.float32), np.array(angles, dtype=np.float32)
+
+
+def fit_grid(centers: np.ndarray, sides: np.ndarray, angles: np.ndarray):
+    # 스티커 후보 중 크기와 방향이 비슷하고 3x3 격자 칸에 떨어지는 묶음을 찾아 격자를 맞춘다. 못 찾으면 None
+    if len(centers) < 5:
+        return None
+    distances = np.linalg.norm(centers[:, None] - centers[None], axis=2)
+    turn = np.abs(np.angle(np.exp(4j * (angles[:, None] - angles[None])))) / 4
+    near = (turn < np.radians(12)) & (distances < 4.2 * sides[:, None])
+    near &= (sides[None, :] >= 0.7 * sides[:, None]) & (sides[None, :] <= 1.4 * sides[:, None])
+    best, best_score = None, None
+    tried = set()
+    for seed in range(len(centers)):
+        members = np.flatnonzero(near[seed])
+        # 격자가 잘 잡힌 경우 모든 스티커가 같은 묶음을 만들므로 한 번만 본다.
+        if len(members) < 5 or members.tobytes() in tried:
+            continue
+        tried.add(members.tobytes())
+        group = centers[members]
+        axis_u = np.array([np.cos(angles[seed]), np.sin(angles[seed])], dtype=np.float32)
+        axis_v = np.array([-axis_u[1], axis_u[0]], dtype=np.float32)
+        projected = np.stack([group @ axis_u, group @ axis_v], axis=1)
+
+        # 이웃 스티커 사이 거리 : 가장 가까운 다른 후보까지 거리의 중앙값
+        nearest = distances[np.ix_(members, members)] + np.diag(np.full(len(members), np.inf))
+        pitch = float(np.median(nearest.min(axis=1)))
+        cells = np.rint((projected - projected.min(axis=0)) / pitch)
+        if cells.max() != 2 or len(np.unique(cells[:, 0] * 3 + cells[:, 1])) != len(cells):
+            continue
+        error = float(np.abs(projected - projected.min(axis=0) - cells * pitch).max()) / pitch
+        if error > 0.3:
+            continue
+        score = (len(members), -error)
+        if best_score is None or score > best_score:
+            best, best_score = (cells, group), score
+    if best is None:
+        return None
+
+    # 격자 번호 -> 화면 좌표 affine 변환을 최소제곱으로 맞추고, 비어있는 칸도 채운다.
+    cells, group = best
+    design = np.hstack([cells, np.ones((len(cells), 1))])
+    transform, *_ = np.linalg.lstsq(design, group, rcond=None)
+    full = np.hstack([GRID_CELLS, np.ones((9, 1))]) @ transform
+    corners = np.hstack([GRID_CORNERS, np.ones((4, 1))]) @ transform
+    pitch = float(np.linalg.norm(transform[0]) + np.linalg.norm(transform[1])) / 2
+    return GridLocation(full.astype(np.float32), corners.astype(np.float32), pitch)
+
+
+class CubeLocator:
+    # 축소한 이미지에서 스티커 격자를 찾고 원본 해상도 좌표로 돌려준다.
+    # 한 번 찾은 뒤에는 이전 위치 주변만 찾고, redetect_every 프레임마다 또는 놓쳤을 때만 전체를 다시 찾는다.
+    def __init__(self, width=320, redetect_every=30, smoothing=0.5) -> None:
+        self.width = width
+        self.redetect_every = redetect_every
+        self.smoothing = smoothing
+        self.location = None
+        self._since_detect = 0
+        self.full_detections = 0
+        self.tracked_detections = 0
+
+    def reset(self):
+        self.location = None
+        self._since_detect = 0
+
+    def _detect(self, frame: np.ndarray, rect=None):
+        x0, y0 = 0, 0
+        if rect is not None:
+            x0, y0, x1, y1 = rect
+            frame = frame[y0:y1, x0:x1]
+        # 흑백으로 바꾼 뒤 너비가 width 이하가 될 때까지 피라미드로 절반씩 줄인다.
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        scale = 1.0
+        while gray.shape[1] > self.width:
+            gray = cv2.pyrDown(gray)
+            scale *= 0.5
+        location = fit_grid(*find_sticker_squares(gray))
+        if location is None:
+            return None
+        return location.shifted(x0, y0, 1.0 / scale)
+
+    def locate(self, frame: np.ndarray):
+        location = None
+        previous = self.location
+        if previous is not None and self._since_detect < self.redetect_every:
+            # 이전 위치 주변 (스티커 두 칸 여유)만 잘라서 찾는다.
+            location = self._detect(frame, previous.bounding_rect(frame.shape, margin=2.0))
+            if location is not None:
+                location.tracked = True
+                self.tracked_detections += 1
+                self._since_detect += 1
+        if location is None:
+            location = self._detect(frame)
+            self.full_detections += 1
+            self._since_detect = 0
+        if location is not None and previous is not None:
+            # 조금 움직인 경우에만 이전 위치와 섞어서 떨림을 줄인다.
+            if np.abs(location.centers - previous.centers).max() < 0.3 * previous.pitch:
+                a = self.smoothing
+                location = GridLocation(a * previous.centers + (1 - a) * location.centers,
+                                        a * previous.corners + (1 - a) * location.corners,
+                                        a * previous.pitch + (1 - a) * location.pitch, location.tracked)
+        self.location = location
+        return location
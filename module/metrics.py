@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class RollingStats:
+    # 한 단계의 최근 window개 소요 시간과 기록 시각을 고정 크기 원형 버퍼에 남긴다.
+    # 기록은 리스트 두 칸에 쓰는 것뿐이고(numpy 배열 원소 쓰기보다 빠르다), 백분위수는 화면이나 파일로 내보낼 때만 계산한다.
+    def __init__(self, window=256) -> None:
+        self.window = window
+        self._seconds = [0.0] * window
+        self._times = [0.0] * window
+        self._next = 0
+        self.count = 0
+
+    def add(self, seconds: float, now: float):
+        i = self._next
+        self._seconds[i] = seconds
+        self._times[i] = now
+        self._next = (i + 1) % self.window
+        self.count += 1
+
+    def summary(self) -> dict:
+        filled = min(self.count, self.window)
+        if filled == 0:
+            return {'count': 0}
+        # 다른 스레드가 기록하는 중일 수 있으므로 복사본으로 계산한다.
+        seconds = np.array(self._seconds[:filled]) * 1e3
+        times = np.array(self._times[:filled])
+        span = times.max() - times.min()
+        p50, p95, p99 = np.percentile(seconds, (50, 95, 99))
+        return {
+            'count': self.count,
+            'rate': round((filled - 1) / span, 2) if span > 0 else 0.0,   # 초당 기록 횟수 (FPS)
+            'mean_ms': round(float(seconds.mean()), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(seconds.max()), 3),
+        }
+
+
+class StageMetrics:
+    # 단계 이름별 RollingStats. 카메라 읽기, 색 변환, 분류, 오버레이, QImage/QPixmap 변환, solve/validate 등을 잰다.
+    def __init__(self, window=256) -> None:
+        self.window = window
+        self.enabled = True
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, name) -> RollingStats:
+        stats = self._stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stages.setdefault(name, RollingStats(self.window))
+        return stats
+
+    def record(self, name: str, seconds: float, now=None):
+        if self.enabled:
+            self._stage(name).add(seconds, time.perf_counter() if now is None else now)
+
+    def since(self, name: str, start: float) -> float:
+        # start(perf_counter)부터 지금까지를 기록하고 지금 시각을 돌려준다. 이어지는 단계를 잴 때 쓴다.
+        now = time.perf_counter()
+        if self.enabled:
+            self._stage(name).add(now - start, now)
+        return now
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.since(name, start)
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = dict(self._stages)
+        return {name: stats.summary() for name, stats in sorted(stages.items())}
+
+    def status_text(self, names=None) -> str:
+        # GUI 상태 표시줄용 한 줄 요약 : 'display 29.8 fps | analysis 15.0 fps | read p95 3.1ms | ...'
+        # 화면에 그린 횟수(pixmap)와 분석한 횟수(analysis)의 초당 비율을 FPS로 보여준다.
+        snapshot = self.snapshot()
+        parts = []
+        for label, name in (('display', 'pixmap'), ('analysis', 'analysis')):
+            if snapshot.get(name, {}).get('count'):
+                parts.append(f"{label} {snapshot[name]['rate']:.1f} fps")
+        for name in names or snapshot:
+            summary = snapshot.get(name)
+            if summary and summary['count']:
+                parts.append(f"{name} p95 {summary['p95_ms']:.1f}ms")
+        return " | ".join(parts)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump({'time': time.time(), 'stages': self.snapshot()}, f, indent=4)
+
+    def prometheus_text(self) -> str:
+        snapshot = {name: summary for name, summary in self.snapshot().items() if summary['count']}
+        lines = ['# TYPE r3_stage_seconds summary']
+        for name, summary in snapshot.items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'r3_stage_seconds{{stage="{name}",quantile="{quantile}"}} {summary[key] / 1e3:.6f}')
+            lines.append(f'r3_stage_seconds_count{{stage="{name}"}} {summary["count"]}')
+        lines.append('# TYPE r3_stage_rate gauge')
+        for name, summary in snapshot.items():
+            lines.append(f'r3_stage_rate{{stage="{name}"}} {summary["rate"]}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    # 로컬 모니터링용 HTTP 서버. /metrics 는 Prometheus 텍스트 형식, /metrics.json 은 snapshot() JSON
+    def __init__(self, metrics: StageMetrics, port=9464, host='127.0.0.1') -> None:
+        self.metrics = metrics
+        handler = self._handler(metrics)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    @staticmethod
+    def _handler(metrics):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.prometheus_text().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='MetricsServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+METRICS = StageMetrics()
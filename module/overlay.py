@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+from .color import ColorUtils
+
+
+def _draw_help_arrow(frame, current_center, paint):
+    cv2.putText(frame, f"Capture Helper Mode Activate Current Capture Color : {ColorUtils.get_long_color_name(ColorUtils.face_to_color(current_center))}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, paint((0, 0, 0)), 2, cv2.LINE_8)
+    if current_center == "F":
+        # U (Yellow)라는 글자가 roi의 위쪽에 위치하도록 한다.
+        cv2.putText(frame, "U (Yellow)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 - 150), cv2.FONT_HERSHEY_SIMPLEX, 1, paint((0, 255, 255)), 2, cv2.LINE_8)
+        # F (Green)라는 글자가 roi의 중앙에 위치하도록 한다.
+        cv2.putText(frame, "F (Green)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 + 10), cv2.FONT_HERSHEY_SIMPLEX, 1, paint((0, 255, 0)), 2, cv2.LINE_8)
+        # D (White)라는 글자가 roi의 아래쪽에 위치하도록 한다.
+        cv2.putText(frame, "D (Down)", (frame.shape[1] // 2 - 10, frame.shape[0] // 2 + 150), cv2.FONT_HERSHEY_SIMPLEX, 1, paint((255, 255, 255)), 2, cv2.LINE_8)
+    elif current_center in ("R", "B", "L"):
+        # R, B, L이 차례로 정면에 위치하도록 오른쪽에서 왼쪽으로 가는 화살표를 그린다.
+        cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), paint((255, 255, 0)), 2, cv2.LINE_8)
+    elif current_center == "U":
+        # U가 정면에 위치하도록 화살표를 그린다. 왼쪽에서 오른쪽으로 가다가 중간에 위로 꺾는 화살표를 그려야함 총 2개를 그려야겠지.
+        cv2.arrowedLine(frame, (frame.shape[1] // 2 - 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2 + 50), paint((255, 255, 0)), 2, cv2.LINE_8)
+        cv2.arrowedLine(frame, (frame.shape[1] // 2 + 50, frame.shape[0] // 2), (frame.shape[1] // 2 - 50, frame.shape[0] // 2), paint((255, 255, 0)), 2, cv2.LINE_8)
+    elif current_center == "D":
+        # D가 정면에 위치하도록 화살표를 그린다. U의 경우와 같은 방향으로 화살표를 그려야함
+        cv2.arrowedLine(frame, (frame.shape[1] // 2, frame.shape[0] // 2 + 50), (frame.shape[1] // 2, frame.shape[0] // 2 - 50), paint((255, 255, 0)), 2, cv2.LINE_8)
+
+
+def _draw_static(frame, roi, capture_step, paint):
+    # 프레임 크기와 캡처 단계가 같으면 항상 똑같이 그려지는 부분
+    height, width = frame.shape[:2]
+    # 스티커 격자를 찾아서 읽는 중이면(roi가 None) 고정 ROI의 검출 지점은 그리지 않는다.
+    if roi is not None:
+        roi_x, roi_y, roi_size = roi
+        sub_roi_size = roi_size // 3
+        for i in range(3):
+            for j in range(3):
+                # 작은 ROI 내부의 중앙에 색상을 검출하는 지점 가시화
+                center = (roi_x + j * sub_roi_size + sub_roi_size // 2, roi_y + i * sub_roi_size + sub_roi_size // 2)
+                cv2.circle(frame, center, 2, paint((0, 0, 0)), -1, cv2.LINE_8)
+
+    cv2.circle(frame, (width // 2, height // 2), 10, paint((255, 255, 255)), 1, cv2.LINE_8)
+
+    if capture_step is not None:
+        _draw_help_arrow(frame, capture_step, paint)
+
+
+# 픽셀 단위 마스크로 합성하므로 고정된 그림은 안티에일리어싱 없이(LINE_8) 그린다.
+
+class OverlayRenderer:
+    # 고정된 그림(격자 중심점, 조준 원, 캡처 도우미 화살표/글씨)은 해상도와 캡처 단계마다 한 번만 그려두고,
+    # 매 프레임에는 그려진 픽셀만 한 번에 복사해서 합성한다. 스티커 색상 상자와 글씨만 매번 그린다.
+    max_cache_size = 16
+
+    def __init__(self) -> None:
+        self._cache = {}
+
+    def static_layer(self, shape, roi, capture_step):
+        key = (tuple(shape), roi and tuple(roi), capture_step)
+        if key not in self._cache:
+            if len(self._cache) >= self.max_cache_size:
+                self._cache.clear()
+            layer = np.zeros(shape, dtype=np.uint8)
+            mask = np.zeros(shape[:2], dtype=np.uint8)
+            _draw_static(layer, roi, capture_step, lambda color: color)
+            _draw_static(mask, roi, capture_step, lambda color: 255)
+
+            # 실제로 그려진 픽셀의 위치와 색만 남겨둔다.
+            ys, xs = np.nonzero(mask)
+            self._cache[key] = (ys, xs, layer[ys, xs])
+        return self._cache[key]
+
+    def compose(self, frame, roi, capture_step, labels, stability=None, location=None):
+        if location is not None:
+            self._draw_location(frame, location, labels, stability)
+            ys, xs, values = self.static_layer(frame.shape, None, capture_step)
+            frame[ys, xs] = values
+            return frame
+
+        roi_x, roi_y, roi_size = roi
+        sub_roi_size = roi_size // 3
+        for index, color_name in enumerate(labels):
+            sub_x = roi_x + (index % 3) * sub_roi_size
+            sub_y = roi_y + (index // 3) * sub_roi_size
+            color = ColorUtils.get_bgr_color(color_name)
+
+            # 작은 ROI 그리기
+            cv2.rectangle(frame, (sub_x, sub_y), (sub_x + sub_roi_size, sub_y + sub_roi_size), color, 2)
+
+            # 작은 ROI의 중앙 상단에 글씨 표시
+            cv2.putText(frame, color_name, (sub_x + sub_roi_size // 2 - 8, sub_y + sub_roi_size // 2 - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
+
+            if stability is not None:
+                # 작은 ROI 아래쪽에 안정도 막대 표시. 다 차면 초록, 아니면 빨강
+                bar_width = int((sub_roi_size - 8) * stability[index])
+                bar_color = (0, 255, 0) if stability[index] >= 1.0 else (0, 0, 255)
+                cv2.rectangle(frame, (sub_x + 4, sub_y + sub_roi_size - 10), (sub_x + 4 + bar_width, sub_y + sub_roi_size - 6), bar_color, -1)
+
+        # 고정된 그림은 이전처럼 스티커 상자 위에 덮어쓴다.
+        ys, xs, values = self.static_layer(frame.shape, roi, capture_step)
+        frame[ys, xs] = values
+        return frame
+
+    @staticmethod
+    def _draw_location(frame, location, labels, stability):
+        # 찾은 격자를 따라 기울어진 스티커 칸과 면 전체 윤곽을 그린다.
+        cv2.polylines(frame, [np.rint(location.corners).astype(np.int32)], True, (255, 255, 255), 1)
+        quads = np.rint(location.cell_quads()).astype(np.int32)
+        half = int(location.pitch // 2)
+        for index, color_name in enumerate(labels):
+            color = ColorUtils.get_bgr_color(color_name)
+            cv2.polylines(frame, [quads[index]], True, color, 2)
+            center_x, center_y = np.rint(location.centers[index]).astype(int)
+            cv2.putText(frame, color_name, (center_x - 8, center_y - half // 3), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
+
+            if stability is not None:
+                bar_width = int((half - 4) * 2 * stability[index])
+                bar_color = (0, 255, 0) if stability[index] >= 1.0 else (0, 0, 255)
+                cv2.rectangle(frame, (center_x - half + 4, center_y + half // 2), (center_x - half + 4 + bar_width, center_y + half // 2 + 4), bar_color, -1)
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class StickerSampler:
+    # ROI를 3x3 격자로 나누고, 각 칸 중앙의 patch_size x patch_size 영역에서
+    # 대표 HSV 값을 한 번의 NumPy 연산으로 구한다.
+    METHODS = ('median', 'trimmed_mean')
+
+    def __init__(self, patch_size=9, method='median', trim=0.2) -> None:
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown sampling method: {method}")
+        self.patch_size = patch_size
+        self.method = method
+        self.trim = trim
+
+    def patches(self, hsv_roi: np.ndarray) -> np.ndarray:
+        # (9, patch_size * patch_size, 3) 모양으로 스티커별 픽셀을 모은다.
+        cell = hsv_roi.shape[0] // 3
+        patch = max(1, min(self.patch_size, cell))
+        offset = cell // 2 - patch // 2
+        grid = hsv_roi[:cell * 3, :cell * 3].reshape(3, cell, 3, cell, -1)
+        grid = grid[:, offset:offset + patch, :, offset:offset + patch]
+        return grid.transpose(0, 2, 1, 3, 4).reshape(9, patch * patch, -1)
+
+    def patches_at(self, image: np.ndarray, centers: np.ndarray, patch=None) -> np.ndarray:
+        # 위치를 찾은 스티커 중심마다 patch x patch 영역을 잘라 (9, patch * patch, 채널) 로 모은다.
+        # 프레임 전체가 아니라 이 픽셀들만 색 변환하면 된다. 영역은 프레임 안으로 민다.
+        patch = max(1, min(patch or self.patch_size, self.patch_size, image.shape[0], image.shape[1]))
+        x0 = np.clip(np.rint(centers[:, 0]).astype(int) - patch // 2, 0, image.shape[1] - patch)
+        y0 = np.clip(np.rint(centers[:, 1]).astype(int) - patch // 2, 0, image.shape[0] - patch)
+        offsets = np.arange(patch)
+        ys = (y0[:, None] + offsets)[:, :, None]
+        xs = (x0[:, None] + offsets)[:, None, :]
+        return image[ys, xs].reshape(len(centers), patch * patch, -1)
+
+    def sample(self, hsv_roi: np.ndarray) -> np.ndarray:
+        return self.reduce(self.patches(hsv_roi))
+
+    def reduce(self, patches: np.ndarray) -> np.ndarray:
+        values = patches.astype(np.int16)
+
+        # 빨간색처럼 Hue가 0과 179 사이에 걸쳐 있으면 작은 값을 180만큼 올려서 계산한다.
+        hue = values[..., 0]
+        wraps = (hue.max(axis=1) - hue.min(axis=1)) > 90
+        values[..., 0] = np.where(wraps[:, None] & (hue < 90), hue + 180, hue)
+
+        if self.method == 'median':
+            result = np.median(values, axis=1)
+        else:
+            values.sort(axis=1)
+            cut = int(values.shape[1] * self.trim)
+            result = values[:, cut:values.shape[1] - cut].mean(axis=1)
+
+        result = np.rint(result).astype(np.int16)
+        result[:, 0] %= 180
+        return result.astype(np.uint8)
@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.cube_batch import CubeBatch
+from module.cube_state import MOVE_NAMES, SOLVED_CUBE
+from module.cubie import CENTERS, CORNER_FACELETS, CORNER_NAMES, EDGE_FACELETS, EDGE_NAMES, FACES
+
+_CORNER_FACELETS = np.array(CORNER_FACELETS)
+_EDGE_FACELETS = np.array(EDGE_FACELETS)
+# 조각별 색 (U/D 색부터 시계 방향) ASCII 코드
+_CORNER_COLORS = np.array([[ord(c) for c in name] for name in CORNER_NAMES], dtype=np.uint8)
+_EDGE_COLORS = np.array([[ord(c) for c in name] for name in EDGE_NAMES], dtype=np.uint8)
+_CENTER_COLORS = np.array([ord(face) for face in FACES], dtype=np.uint8)
+
+
+def _gather_table(colors: np.ndarray) -> np.ndarray:
+    # [조각 * modulus + 방향] -> 그 자리의 facelet 순서대로 놓인 색. 방향이 o인 조각의 k번째 색은 (o + k)번째 facelet에 붙는다.
+    modulus = colors.shape[1]
+    turn = np.arange(modulus)
+    return np.array([colors[piece][(turn - ori) % modulus] for piece in range(len(colors)) for ori in range(modulus)])
+
+
+_CORNER_TABLE = _gather_table(_CORNER_COLORS)
+_EDGE_TABLE = _gather_table(_EDGE_COLORS)
+
+
+def _random_permutations(rng, count, size) -> np.ndarray:
+    return np.argsort(rng.random((count, size)), axis=1)
+
+
+def _parity(perms: np.ndarray) -> np.ndarray:
+    # (N, n) 순열마다 (n - 사이클 수)의 홀짝. 각 자리에서 순열을 2^k번 따라가며 사이클의 가장 작은 자리를 구하고,
+    # 자기 자신이 가장 작은 자리인 수가 사이클 수다. 길이 n의 사이클은 log2(n)번이면 다 돈다.
+    count, size = perms.shape
+    positions = np.arange(size, dtype=np.uint8)
+    # 행마다 오프셋을 더해 한 줄로 편 배열에서 바로 모은다. (take_along_axis보다 빠르다)
+    step = perms + np.arange(0, count * size, size)[:, None]
+    lowest = np.tile(positions, (count, 1))
+    for _ in range(max(size - 1, 1).bit_length()):
+        lowest = np.minimum(lowest, lowest.ravel()[step])
+        step = step.ravel()[step]
+    return (size - (lowest == positions).sum(axis=1)) % 2
+
+
+def _random_orientations(rng, count, size, modulus) -> np.ndarray:
+    # 마지막 조각의 방향은 나머지 방향의 합이 modulus의 배수가 되도록 정해진다.
+    orientations = rng.integers(0, modulus, (count, size), dtype=np.int64)
+    orientations[:, -1] = -orientations[:, :-1].sum(axis=1) % modulus
+    return orientations
+
+
+def cubie_to_facelets(cp, co, ep, eo) -> np.ndarray:
+    # (N, 8), (N, 8), (N, 12), (N, 12) 조각 좌표를 (N, 54) facelet 배열로 바꾼다. (cubie.to_cubie의 역변환)
+    count = len(cp)
+    facelets = np.empty((count, 54), dtype=np.uint8)
+    facelets[:, list(CENTERS)] = _CENTER_COLORS
+    facelets[:, _CORNER_FACELETS.ravel()] = _CORNER_TABLE[cp * 3 + co].reshape(count, -1)
+    facelets[:, _EDGE_FACELETS.ravel()] = _EDGE_TABLE[ep * 2 + eo].reshape(count, -1)
+    return facelets
+
+
+def random_states(count: int, seed=None) -> CubeBatch:
+    # 풀 수 있는 상태 전체에서 균일하게 count개를 뽑는다.
+    rng = np.random.default_rng(seed)
+    cp = _random_permutations(rng, count, 8)
+    ep = _random_permutations(rng, count, 12)
+    # 코너와 엣지 순열의 홀짝이 다르면 엣지 두 개를 바꿔서 맞춘다. (홀수 -> 짝수 일대일 대응이라 균일성이 유지된다)
+    odd = _parity(cp) != _parity(ep)
+    ep[odd, 0], ep[odd, 1] = ep[odd, 1], ep[odd, 0].copy()
+    co = _random_orientations(rng, count, 8, 3)
+    eo = _random_orientations(rng, count, 12, 2)
+    return CubeBatch(cubie_to_facelets(cp, co, ep, eo))
+
+
+def random_move_indices(count: int, length: int, seed=None) -> np.ndarray:
+    # 같은 면을 연달아 돌리지 않는 임의의 회전 번호 (count, length)
+    rng = np.random.default_rng(seed)
+    faces = np.empty((count, length), dtype=np.intp)
+    if length:
+        faces[:, 0] = rng.integers(0, 6, count)
+        steps = rng.integers(1, 6, (count, length - 1))
+        faces[:, 1:] = (faces[:, :1] + np.cumsum(steps, axis=1)) % 6
+    # MOVE_NAMES는 면마다 (X, X2, X') 순서
+    return faces * 3 + rng.integers(0, 3, (count, length))
+
+
+def random_scrambles(count: int, length=25, seed=None) -> tuple[list[str], CubeBatch]:
+    # 맞춰진 큐브에 임의의 length수 섞기를 적용한다. (섞기 수순, 결과 상태)
+    indices = random_move_indices(count, length, seed)
+    names = np.array(MOVE_NAMES)[indices]
+    scrambles = [' '.join(row) for row in names]
+    states = CubeBatch.from_strings([SOLVED_CUBE] * count).apply_each(indices)
+    return scrambles, states
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print random solvable cube strings, one per line')
+    parser.add_argument('-n', '--count', type=int, default=1000)
+    parser.add_argument('--moves', type=int, default=None, help='scramble length (default: uniformly random states)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--with-scramble', action='store_true', help='also print the scramble after each cube string')
+    args = parser.parse_args(argv)
+
+    if args.moves is None:
+        scrambles, states = None, random_states(args.count, args.seed)
+    else:
+        scrambles, states = random_scrambles(args.count, args.moves, args.seed)
+    for index, cubestring in enumerate(states.to_strings()):
+        if args.with_scramble and scrambles is not None:
+            print(f"{cubestring} # {scrambles[index]}")
+        else:
+            print(cubestring)
+
+
+if __name__ == '__main__':
+    main()
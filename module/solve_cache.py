@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import kociemba
+
+from .cubie import normalize_centers
+from .facelet import ROTATION_FACE_MAPS, ROTATION_PERMUTATIONS
+
+
+def canonical_key(cubestring: str) -> tuple[str, dict]:
+    # 24가지 큐브 회전과 색상 재배치 중 사전순으로 가장 작은 문자열을 대표 상태로 쓴다.
+    # 대표 상태의 풀이를 원래 방향으로 되돌리기 위한 면 매핑도 같이 돌려준다.
+    best_key, best_map = None, None
+    for perm, face_map in zip(ROTATION_PERMUTATIONS, ROTATION_FACE_MAPS):
+        key = normalize_centers(''.join([cubestring[i] for i in perm]))
+        if best_key is None or key < best_key:
+            best_key, best_map = key, face_map
+    return best_key, best_map
+
+
+def map_moves(moves: str, face_map: dict) -> str:
+    return ' '.join(face_map[move[0]] + move[1:] for move in moves.split())
+
+
+class SolutionCache:
+    def __init__(self, maxsize=1024, canonical=True, path=None) -> None:
+        self.maxsize = maxsize
+        self.canonical = canonical
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, cubestring: str) -> tuple[str, dict]:
+        if self.canonical:
+            return canonical_key(cubestring)
+        return normalize_centers(cubestring), None
+
+    def get(self, key: str):
+        with self._lock:
+            moves = self._entries.get(key)
+            if moves is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return moves
+
+    def put(self, key: str, moves: str):
+        with self._lock:
+            self._entries[key] = moves
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def solve(self, cubestring: str, search=None) -> str:
+        # search(key)를 주면 kociemba.solve 대신 쓴다. search가 None을 돌려주면(중단) 저장하지 않고 None
+        key, face_map = self.key(cubestring)
+        moves = self.get(key)
+        if moves is None:
+            # key는 센터가 U R F D L B로 정렬된 문자열이므로 그대로 kociemba에 넘길 수 있다.
+            moves = (search or kociemba.solve)(key)
+            if moves is None:
+                return None
+            self.put(key, moves)
+        return map_moves(moves, face_map) if face_map else moves
+
+    def stats(self) -> dict:
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            data = {'canonical': self.canonical, 'entries': list(self._entries.items())}
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def load(self, path=None):
+        path = path or self.path
+        with open(path, 'r') as f:
+            data = json.load(f)
+        # 다른 키 방식으로 저장된 캐시는 섞어 쓸 수 없으므로 무시한다.
+        if data.get('canonical') != self.canonical:
+            print(f"Solution cache {path} was saved with canonical={data.get('canonical')}, ignored")
+            return
+        for key, moves in data['entries']:
+            self.put(key, moves)
+
+
+SOLUTION_CACHE = SolutionCache()
@@ -0,0 +1,133 @@
+import multiprocessing
+import time
+
+import kociemba
+
+from .cubie import normalize_centers
+
+
+# 첫 kociemba 호출은 pruning table을 읽거나 만들어야 해서 느리다.
+WARMUP_CUBE = 'DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD'
+
+
+def warm_up():
+    start = time.perf_counter()
+    kociemba.solve(WARMUP_CUBE)
+    return time.perf_counter() - start
+
+
+def _anytime_worker(conn):
+    # 자식 프로세스 : (cubestring, max_depth)를 받아서 kociemba 결과를 돌려준다.
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        cubestring, max_depth = request
+        try:
+            conn.send(('ok', kociemba.solve(cubestring, max_depth=max_depth)))
+        except ValueError as e:
+            conn.send(('error', str(e)))
+
+
+class AnytimeSolver:
+    # max_depth를 줄여가며 kociemba를 반복 호출해서 점점 짧은 풀이를 찾는다.
+    # kociemba는 max_depth가 너무 작으면 오래 멈추기 때문에, 시간 제한을 넘기면
+    # 탐색 중인 자식 프로세스를 종료하고 그때까지 찾은 가장 짧은 풀이를 쓴다.
+    poll_interval = 0.05
+
+    def __init__(self) -> None:
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+
+    def _ensure_worker(self):
+        if self._process is None or not self._process.is_alive():
+            self._conn, child_conn = self._context.Pipe()
+            self._process = self._context.Process(target=_anytime_worker, args=(child_conn,), daemon=True)
+            self._process.start()
+            child_conn.close()
+
+    def warm_up(self) -> float:
+        # 자식 프로세스를 미리 띄우고 pruning table을 읽어둔다. 걸린 시간(초)을 돌려준다.
+        start = time.perf_counter()
+        self._ensure_worker()
+        self._conn.send((WARMUP_CUBE, 24))
+        status, result = self._conn.recv()
+        if status != 'ok':
+            raise ValueError(result)
+        return time.perf_counter() - start
+
+    def _kill_worker(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            self._conn.send(None)
+            self._process.join(1)
+        self._kill_worker()
+
+    def _search(self, cubestring: str, max_depth: int, deadline=None, should_stop=None):
+        # 자식 프로세스에서 한 번 탐색한다. deadline이 지나거나 should_stop()이 참이면 자식 프로세스를 종료하고 None
+        self._ensure_worker()
+        self._conn.send((cubestring, max_depth))
+        while not self._conn.poll(self.poll_interval):
+            if (deadline is not None and time.perf_counter() > deadline) or (should_stop and should_stop()):
+                self._kill_worker()
+                return None
+        try:
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._kill_worker()
+            return None
+
+    def solve(self, cubestring: str, max_depth=24, should_stop=None):
+        # 일반 탐색 한 번. 프로세스 안에서 kociemba를 부르는 것과 달리 도중에 중단할 수 있다.
+        # 중단되면 None, 풀 수 없는 상태면 ValueError
+        reply = self._search(normalize_centers(cubestring), max_depth, should_stop=should_stop)
+        if reply is None:
+            return None
+        status, result = reply
+        if status != 'ok':
+            raise ValueError(result)
+        return result
+
+    def solutions(self, cubestring: str, budget: float, target=None, max_depth=24, should_stop=None):
+        # (moves, elapsed)를 더 짧은 풀이를 찾을 때마다 내보낸다.
+        # budget(초)이 지나거나, target 이하의 풀이를 찾거나, 더 짧은 풀이가 없으면 끝난다.
+        start = time.perf_counter()
+        deadline = start + budget
+        cubestring = normalize_centers(cubestring)
+
+        while time.perf_counter() < deadline:
+            reply = self._search(cubestring, max_depth, deadline, should_stop)
+            if reply is None:
+                return
+            status, result = reply
+            if status != 'ok':
+                return
+            yield result, time.perf_counter() - start
+
+            move_count = len(result.split())
+            if (target is not None and move_count <= target) or move_count == 0:
+                return
+            max_depth = move_count - 1
+
+
+ANYTIME_SOLVER = AnytimeSolver()
+
+
+def solve_anytime(cubestring: str, budget: float, target=None, on_improve=None):
+    best = None
+    for moves, elapsed in ANYTIME_SOLVER.solutions(cubestring, budget, target):
+        best = moves
+        if on_improve:
+            on_improve(moves, elapsed)
+    return best
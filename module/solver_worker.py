@@ -0,0 +1,106 @@
+import threading
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from .metrics import METRICS
+from .solve_cache import SOLUTION_CACHE
+from .solver import ANYTIME_SOLVER, AnytimeSolver
+
+class SolverThread(QThread):
+    # GUI 스레드 대신 kociemba 탐색을 수행하고 결과를 시그널로 돌려준다.
+    improved = pyqtSignal(int, str, float)   # request id, moves, elapsed seconds (anytime 모드에서 더 짧은 풀이)
+    solved = pyqtSignal(int, str, float)   # request id, moves, elapsed seconds
+    failed = pyqtSignal(int, str, float)   # request id, error message, elapsed seconds
+    ready = pyqtSignal(float)   # 풀이를 맡는 자식 프로세스의 예열 시간 (초)
+    warm_up_failed = pyqtSignal(str)   # error message
+
+    def __init__(self, cache=SOLUTION_CACHE, solver: AnytimeSolver = ANYTIME_SOLVER, max_depth=24):
+        super().__init__()
+        self.cache = cache
+        # 일반 탐색도 solver의 자식 프로세스에서 해서 cancel()이나 새 요청이 오면 바로 종료할 수 있다.
+        self.solver = solver
+        self.max_depth = max_depth
+        self._condition = threading.Condition()
+        self._pending = None
+        self._last_request_id = 0
+        self._cancelled_request_id = 0
+        self._running = True
+
+    def request(self, cubestring: str, budget=None, target=None) -> int:
+        # 아직 시작하지 않은 이전 요청은 새 요청으로 덮어쓴다.
+        # budget(초)을 주면 그 시간 동안 더 짧은 풀이를 계속 찾는다.
+        with self._condition:
+            self._last_request_id += 1
+            self._pending = (self._last_request_id, cubestring, budget, target)
+            self._condition.notify()
+            return self._last_request_id
+
+    def cancel(self):
+        # 탐색 중인 자식 프로세스를 바로 종료하고, 이미 끝난 결과가 있어도 버리도록 표시한다.
+        with self._condition:
+            self._pending = None
+            self._cancelled_request_id = self._last_request_id
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._pending = None
+            self._condition.notify()
+        self.wait()
+
+    def is_current(self, request_id: int) -> bool:
+        return request_id == self._last_request_id and request_id > self._cancelled_request_id
+
+    def solve_anytime(self, request_id, cubestring, budget, target, should_stop):
+        best = None
+        for moves, elapsed in self.solver.solutions(cubestring, budget, target, should_stop=should_stop):
+            best = moves
+            self.improved.emit(request_id, moves, elapsed)
+        return best
+
+    def run(self):
+        # 모든 탐색을 맡는 자식 프로세스를 첫 요청 전에 미리 띄워두고 결과를 알린다.
+        # 실패해도 스레드는 계속 요청을 받고, 자식 프로세스는 첫 요청 때 다시 띄운다.
+        try:
+            seconds = self.solver.warm_up()
+            print(f"Solver is ready (warm-up {seconds:.3f}s)")
+            self.ready.emit(seconds)
+        except Exception as e:
+            message = str(e) or type(e).__name__
+            print(f"Solver warm-up failed: {message}")
+            self.warm_up_failed.emit(message)
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                request_id, cubestring, budget, target = self._pending
+                self._pending = None
+
+            start = time.perf_counter()
+            should_stop = lambda: not self._running or not self.is_current(request_id)
+            try:
+                moves = None
+                if budget:
+                    moves = self.solve_anytime(request_id, cubestring, budget, target, should_stop)
+                # 시간 안에 풀이를 하나도 못 찾았으면 일반 탐색으로 넘어간다.
+                if moves is None and not should_stop():
+                    moves = self.cache.solve(cubestring, lambda key: self.solver.solve(key, self.max_depth, should_stop))
+                error = None if moves is not None else 'Solver process stopped unexpectedly'
+            except ValueError as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+            METRICS.record('solve', elapsed)
+
+            with self._condition:
+                if not self._running:
+                    return
+                if not self.is_current(request_id):
+                    print(f"Solve request {request_id} dropped (stale)")
+                    continue
+            if error is None:
+                self.solved.emit(request_id, moves, elapsed)
+            else:
+                self.failed.emit(request_id, error, elapsed)
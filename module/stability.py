@@ -0,0 +1,69 @@
+import numpy as np
+
+from .color import COLOR_CODES, ColorUtils
+
+_LABEL_CODES = np.zeros(256, dtype=np.uint8)
+_LABEL_CODES[[ord(c) for c in COLOR_CODES]] = np.arange(len(COLOR_CODES))
+
+
+class StickerVoteBuffer:
+    # 스티커마다 최근 history개 프레임의 색상을 고정 크기 원형 버퍼에 모아두고 다수결로 정한다.
+    # 모션 블러나 반사로 한두 프레임 잘못 읽혀도 캡처되는 면은 바뀌지 않는다.
+    def __init__(self, history=8, stickers=9) -> None:
+        self.history = history
+        self._codes = np.zeros((history, stickers), dtype=np.uint8)
+        self._next = 0
+        self.filled = 0
+
+    def reset(self):
+        self._next = 0
+        self.filled = 0
+
+    def push(self, labels: str):
+        self._codes[self._next] = _LABEL_CODES[np.frombuffer(labels.encode(), dtype=np.uint8)]
+        self._next = (self._next + 1) % self.history
+        self.filled = min(self.filled + 1, self.history)
+
+    def vote(self) -> tuple[str, np.ndarray]:
+        # (다수결 색상 문자열, 스티커별 안정도). 안정도는 버퍼 전체 중 다수결 색과 같은 프레임의 비율이고,
+        # 버퍼가 다 차기 전에는 그만큼 낮게 나온다. 가장 많은 색이 둘 이상이면 'u'로 두어 애매한 스티커는 캡처되지 않는다.
+        recent = self._codes[:self.filled]
+        counts = (recent[:, :, None] == np.arange(len(COLOR_CODES))).sum(axis=0)
+        winners = counts.argmax(axis=1)
+        stability = counts[np.arange(len(winners)), winners] / self.history
+        top_two = np.sort(counts, axis=1)[:, -2:]
+        winners[top_two[:, 0] == top_two[:, 1]] = 0
+        return "".join(COLOR_CODES[code] for code in winners), stability
+
+
+class AutoCapture:
+    # 투표로 정해진 면이 frames번 연속(분석한 프레임 기준) 같고 모든 스티커가 min_stability 이상이면 캡처할 때가 된 것으로 본다.
+    def __init__(self, frames=5, min_stability=0.75) -> None:
+        self.frames = frames
+        self.min_stability = min_stability
+        self.stable_frames = 0
+        self._labels = None
+        self._fired = None
+
+    def reset(self):
+        self.stable_frames = 0
+        self._labels = None
+        self._fired = None
+
+    def update(self, labels: str, stability, captured=(), expected=None) -> bool:
+        # captured : 이미 캡처한 센터 면 문자들, expected : 캡처 도우미가 기다리는 센터 면 문자
+        if stability is None or len(labels) != 9 or 'u' in labels or min(stability) < self.min_stability:
+            self.stable_frames = 0
+            self._labels = None
+            return False
+        self.stable_frames = self.stable_frames + 1 if labels == self._labels else 1
+        self._labels = labels
+        if self.stable_frames < self.frames or labels == self._fired:
+            return False
+
+        center = ColorUtils.color_to_face(labels[4])
+        if (center != expected) if expected else (center in captured):
+            return False
+        # 같은 면을 계속 비추고 있어도 한 번만 캡처한다.
+        self._fired = labels
+        return True
@@ -0,0 +1,242 @@
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.cube_batch import CubeBatch
+from module.cube_codec import RECORD_SIZE, decode_batch, decode_state, encode_batch, encode_state
+from module.cube_state import CubeState
+
+VERSION = 1
+# 기록 파일 : 헤더(16바이트) 뒤에 9바이트 상태가 추가한 순서대로 이어진다. 같은 상태도 볼 때마다 기록한다.
+LOG_MAGIC = b'R3CS'
+LOG_HEADER = struct.Struct('<4sHH8x')
+# 인덱스 파일 : 헤더(32바이트) 뒤에 선형 탐사 해시 테이블. 기록 파일만 있으면 언제든 다시 만들 수 있다.
+INDEX_MAGIC = b'R3CI'
+INDEX_HEADER = struct.Struct('<4sH2xQQQ')   # magic, version, 칸 수, 서로 다른 상태 수, 반영한 기록 수
+SLOT_DTYPE = np.dtype({
+    'names': ['key', 'used', 'count', 'first'],
+    'formats': ['V9', 'u1', '<u4', '<u8'],
+    'offsets': [0, 9, 12, 16],
+    'itemsize': 24,
+})
+
+
+class CubeStateStore:
+    # 스캔한 큐브 상태를 9바이트씩 append-only 파일에 쌓고, 해시 인덱스로 중복 제거/횟수/검색을 한다.
+    # 두 파일 모두 memory-map으로 읽으므로 전체를 메모리에 올리지 않는다.
+    def __init__(self, path, capacity=1024) -> None:
+        self.path = path
+        self.index_path = path + '.idx'
+        self._log = self._open_log()
+        self.records = (os.path.getsize(path) - LOG_HEADER.size) // RECORD_SIZE
+        self._slots = None
+        self.capacity = 0
+        self.size = 0
+        self._open_index(capacity)
+
+    def _open_log(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'wb') as f:
+                f.write(LOG_HEADER.pack(LOG_MAGIC, VERSION, RECORD_SIZE))
+        log = open(self.path, 'rb+')
+        magic, version, record_size = LOG_HEADER.unpack(log.read(LOG_HEADER.size))
+        if magic != LOG_MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            log.close()
+            raise ValueError(f"{self.path} is not a cube state store")
+        # 기록 도중 끊겨서 잘린 마지막 상태는 버린다.
+        size = os.path.getsize(self.path)
+        end = size - (size - LOG_HEADER.size) % RECORD_SIZE
+        if end != size:
+            log.truncate(end)
+        log.seek(0, os.SEEK_END)
+        return log
+
+    def _open_index(self, capacity):
+        header = None
+        if os.path.exists(self.index_path) and os.path.getsize(self.index_path) >= INDEX_HEADER.size:
+            with open(self.index_path, 'rb') as f:
+                header = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if header is not None and header[:2] == (INDEX_MAGIC, VERSION) and header[4] == self.records:
+            _, _, self.capacity, self.size, _ = header
+            self._slots = self._map_index(self.index_path, self.capacity)
+            return
+        # 헤더의 반영한 기록 수가 기록 파일과 다르면(중간에 종료된 경우 등) 일부 칸에는 이미 새 기록이 들어가 있을 수 있다.
+        # 그 위에 이어서 넣으면 두 번 세게 되므로 기록 파일 전체로 인덱스를 다시 만든다.
+        self._create_index(max(capacity, _capacity_for(self.records)))
+        records = self.log_records()
+        for position in range(self.records):
+            self._insert(records[position].tobytes(), position)
+        self._write_index_header()
+
+    @staticmethod
+    def _map_index(path, capacity):
+        return np.memmap(path, dtype=SLOT_DTYPE, mode='r+', offset=INDEX_HEADER.size, shape=(capacity,))
+
+    def _create_index(self, capacity, path=None):
+        path = path or self.index_path
+        with open(path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION, capacity, 0, 0))
+            f.truncate(INDEX_HEADER.size + capacity * SLOT_DTYPE.itemsize)
+        self.capacity = capacity
+        self.size = 0
+        self._slots = self._map_index(path, capacity)
+
+    def _write_index_header(self):
+        self._slots.flush()
+        with open(self.index_path, 'rb+') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION, self.capacity, self.size, self.records))
+
+    def _find(self, key: bytes) -> int:
+        # key가 있는 칸 또는 key를 넣을 빈 칸의 번호
+        mask = self.capacity - 1
+        slot = zlib.crc32(key) & mask
+        slots = self._slots
+        while slots['used'][slot] and slots['key'][slot].tobytes() != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _insert(self, key: bytes, position: int) -> int:
+        slot = self._find(key)
+        entry = self._slots[slot]
+        if entry['used']:
+            entry['count'] += 1
+            return int(entry['count'])
+        if (self.size + 1) * 2 > self.capacity:
+            # 절반 이상 차면 두 배 크기로 다시 만든다.
+            self._grow()
+            return self._insert(key, position)
+        self._slots[slot] = (key, 1, 1, position)
+        self.size += 1
+        return 1
+
+    def _grow(self):
+        old = self._slots[self._slots['used'] == 1].copy()
+        self._slots.flush()
+        del self._slots
+        temp_path = self.index_path + '.tmp'
+        self._create_index(self.capacity * 2, temp_path)
+        for key, _, count, first in old:
+            slot = self._find(key.tobytes())
+            self._slots[slot] = (key, 1, count, first)
+        self.size = len(old)
+        self._slots.flush()
+        del self._slots
+        os.replace(temp_path, self.index_path)
+        self._slots = self._map_index(self.index_path, self.capacity)
+        self._write_index_header()
+
+    def add(self, cubestring: str) -> int:
+        # 상태를 기록하고 지금까지 본 횟수를 돌려준다.
+        return self.add_records(encode_state(cubestring))[0]
+
+    def add_many(self, cubestrings) -> list[int]:
+        states = [CubeState(cubestring) for cubestring in cubestrings]
+        if not states:
+            return []
+        return self.add_records(encode_batch(CubeBatch.from_states(states)))
+
+    def add_records(self, records) -> list[int]:
+        records = np.asarray(np.frombuffer(records, dtype=np.uint8) if isinstance(records, bytes) else records, dtype=np.uint8)
+        records = records.reshape(-1, RECORD_SIZE)
+        self._log.write(records.tobytes())
+        self._log.flush()
+        counts = [self._insert(record.tobytes(), self.records + i) for i, record in enumerate(records)]
+        self.records += len(records)
+        self._write_index_header()
+        return counts
+
+    def _entry(self, cubestring: str):
+        key = encode_state(cubestring)
+        entry = self._slots[self._find(key)]
+        return entry if entry['used'] else None
+
+    def count(self, cubestring: str) -> int:
+        entry = self._entry(cubestring)
+        return 0 if entry is None else int(entry['count'])
+
+    def first_seen(self, cubestring: str):
+        # 이 상태가 처음 기록된 순번. 없으면 None
+        entry = self._entry(cubestring)
+        return None if entry is None else int(entry['first'])
+
+    def __contains__(self, cubestring: str) -> bool:
+        return self._entry(cubestring) is not None
+
+    def __len__(self) -> int:
+        # 서로 다른 상태의 수
+        return self.size
+
+    def log_records(self) -> np.ndarray:
+        # 기록 파일 전체를 (기록 수, 9) 배열로 memory-map 한다.
+        if self.records == 0:
+            return np.empty((0, RECORD_SIZE), dtype=np.uint8)
+        return np.memmap(self.path, dtype=np.uint8, mode='r', offset=LOG_HEADER.size, shape=(self.records, RECORD_SIZE))
+
+    def state(self, position: int) -> str:
+        # position번째로 기록된 상태 (Cube._parse_face와 같은 facelet 문자열, 센터는 U R F D L B)
+        return decode_state(self.log_records()[position].tobytes())
+
+    def unique(self):
+        # (상태 문자열, 본 횟수)를 처음 기록된 순서대로
+        used = self._slots[self._slots['used'] == 1]
+        used = used[np.argsort(used['first'], kind='stable')]
+        records = np.frombuffer(used['key'].tobytes(), dtype=np.uint8).reshape(-1, RECORD_SIZE)
+        return list(zip(decode_batch(records).to_strings(), used['count'].tolist()))
+
+    def stats(self) -> dict:
+        return {'records': self.records, 'unique': self.size, 'capacity': self.capacity,
+                'bytes': os.path.getsize(self.path) + os.path.getsize(self.index_path)}
+
+    def close(self):
+        if self._slots is not None:
+            self._write_index_header()
+            self._slots = None
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _capacity_for(count: int) -> int:
+    capacity = 1024
+    while capacity < count * 2:
+        capacity *= 2
+    return capacity
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append cube strings to a binary state store and print counts')
+    parser.add_argument('store', help='store file (the index is kept next to it as <store>.idx)')
+    parser.add_argument('--add', help="file with one facelet string per line ('-' for stdin)")
+    parser.add_argument('--count', nargs='*', default=[], help='print how many times each cube string was seen')
+    parser.add_argument('--dump', action='store_true', help='print every distinct state with its count')
+    args = parser.parse_args(argv)
+
+    with CubeStateStore(args.store) as store:
+        if args.add:
+            source = sys.stdin if args.add == '-' else open(args.add, 'r')
+            try:
+                lines = [line.split('#', 1)[0].strip() for line in source]
+                store.add_many([line for line in lines if line])
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+        for cubestring in args.count:
+            print(cubestring, store.count(cubestring))
+        if args.dump:
+            for cubestring, count in store.unique():
+                print(cubestring, count)
+        print(store.stats(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
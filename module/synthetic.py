@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.color import ColorUtils
+from module.cubie import FACES
+from module.scramble import random_states
+
+# 실제 큐브 스티커와 비슷한 색 (HSV). 기본 COLORS 범위 안쪽에 들어간다.
+STICKER_HSV = {
+    'o': (16, 220, 235),
+    'r': (3, 210, 190),
+    'g': (65, 200, 170),
+    'b': (112, 220, 170),
+    'y': (28, 200, 230),
+    'w': (0, 20, 230),
+}
+STICKER_BGR = {
+    name: cv2.cvtColor(np.uint8([[hsv]]), cv2.COLOR_HSV2BGR)[0, 0].astype(np.float32)
+    for name, hsv in STICKER_HSV.items()
+}
+BODY_BGR = (20, 20, 20)
+
+# 템플릿 이미지 : 한 칸이 TEMPLATE_CELL 픽셀인 3x3 면. 값은 스티커 번호(0~8), 큐브 몸체(9), 배경(10)
+TEMPLATE_CELL = 32
+STICKER_FILL = 0.84
+BODY, BACKGROUND = 9, 10
+
+
+def _template() -> np.ndarray:
+    size = TEMPLATE_CELL * 3
+    template = np.full((size, size), BODY, dtype=np.uint8)
+    inset = int(round(TEMPLATE_CELL * (1 - STICKER_FILL) / 2))
+    for index in range(9):
+        x, y = (index % 3) * TEMPLATE_CELL, (index // 3) * TEMPLATE_CELL
+        template[y + inset:y + TEMPLATE_CELL - inset, x + inset:x + TEMPLATE_CELL - inset] = index
+    return template
+
+_TEMPLATE = _template()
+_TEMPLATE_CORNERS = np.float32([(0, 0), (3, 0), (3, 3), (0, 3)]) * TEMPLATE_CELL
+_TEMPLATE_CENTERS = np.float32([((i % 3) + 0.5, (i // 3) + 0.5) for i in range(9)]) * TEMPLATE_CELL
+
+
+def face_labels(cubestring: str, face='F') -> str:
+    # Cube 형식(URFDLB facelet 문자열)에서 한 면의 9개 스티커 색상 문자열
+    start = FACES.index(face) * 9
+    return "".join(ColorUtils.face_to_color(f) for f in cubestring[start:start + 9])
+
+
+class SyntheticFaceGenerator:
+    # 정답 색상을 알고 있는 큐브 한 면의 카메라 프레임을 묶음 단위로 만든다.
+    # 모양(원근, 회전, 위치)은 프레임마다 템플릿을 warpPerspective 하고, 조명/화이트 밸런스/반사/노이즈는
+    # (N, H, W, 3) 배열에 한 번에 적용한다. 범위 인자는 (최소, 최대)이고 프레임마다 그 사이에서 고른다.
+    def __init__(self, size=(240, 320), seed=None, face_scale=(0.47, 0.53), offset=0.03, rotation=0.08,
+                 perspective=0.04, brightness=(0.7, 1.2), gradient=0.25, white_balance=0.12,
+                 blur=(0.0, 1.2), noise=(1.0, 6.0), glare=0.3, batch_size=64) -> None:
+        self.size = size                    # (높이, 너비)
+        self.rng = np.random.default_rng(seed)
+        self.face_scale = face_scale        # 면 한 변 / 프레임 짧은 변. 0.5면 DetectionEngine의 가운데 ROI와 같다.
+        self.offset = offset                # 면 중심이 프레임 가운데에서 벗어나는 정도 (짧은 변 대비)
+        self.rotation = rotation            # 최대 회전 (라디안)
+        self.perspective = perspective      # 모서리마다 흔드는 정도 (면 한 변 대비)
+        self.brightness = brightness        # 전체 밝기 배율
+        self.gradient = gradient            # 한쪽에서 들어오는 조명으로 생기는 밝기 기울기의 최대값
+        self.white_balance = white_balance  # B, G, R 채널별 배율이 1에서 벗어나는 최대값
+        self.blur = blur                    # Gaussian blur sigma (픽셀)
+        self.noise = noise                  # 픽셀 노이즈 표준편차
+        self.glare = glare                  # 반사광이 생길 확률 (세기와 위치는 무작위)
+        self.batch_size = batch_size        # 한 번에 float32로 계산할 프레임 수
+        self._noise = None
+
+    def _uniform(self, bounds, count):
+        low, high = bounds
+        return self.rng.uniform(low, high, count).astype(np.float32)
+
+    def _geometry(self, count):
+        # 프레임마다 템플릿 -> 화면 homography (N, 3, 3)와 스티커 중심 (N, 9, 2)
+        height, width = self.size
+        short = min(height, width)
+        sides = self._uniform(self.face_scale, count) * short
+        angles = self.rng.uniform(-self.rotation, self.rotation, count)
+        shifts = self.rng.uniform(-self.offset, self.offset, (count, 2)) * short
+        jitter = self.rng.uniform(-self.perspective, self.perspective, (count, 4, 2)) * sides[:, None, None]
+
+        unit = _TEMPLATE_CORNERS / (3 * TEMPLATE_CELL) - 0.5
+        cos, sin = np.cos(angles), np.sin(angles)
+        rotation = np.stack([np.stack([cos, -sin], axis=1), np.stack([sin, cos], axis=1)], axis=1)
+        corners = np.einsum('nij,kj->nki', rotation, unit) * sides[:, None, None] + jitter
+        corners += np.array([width / 2, height / 2]) + shifts[:, None, :]
+
+        homographies = np.stack([cv2.getPerspectiveTransform(_TEMPLATE_CORNERS, c.astype(np.float32)) for c in corners])
+        points = np.concatenate([_TEMPLATE_CENTERS, np.ones((9, 1), dtype=np.float32)], axis=1)
+        projected = np.einsum('nij,kj->nki', homographies, points)
+        centers = projected[..., :2] / projected[..., 2:]
+        return homographies, centers.astype(np.float32)
+
+    def _render_batch(self, labels):
+        count = len(labels)
+        height, width = self.size
+        homographies, centers = self._geometry(count)
+
+        # 프레임마다 칸 번호 지도를 만든다.
+        cells = np.empty((count, height, width), dtype=np.intp)
+        warped = np.empty((height, width), dtype=np.uint8)
+        for n in range(count):
+            cv2.warpPerspective(_TEMPLATE, homographies[n], (width, height), dst=warped, flags=cv2.INTER_NEAREST,
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=BACKGROUND)
+            cells[n] = warped
+        cells += np.arange(0, 11 * count, 11)[:, None, None]
+
+        # 프레임 전체에 똑같이 곱해지는 밝기와 채널별 화이트 밸런스는 (N, 11, 3) 팔레트에 미리 곱해두고,
+        # 칸 번호로 한 번에 색을 가져온다.
+        palette = np.empty((count, 11, 3), dtype=np.float32)
+        palette[:, :9] = [[STICKER_BGR[c] for c in face] for face in labels]
+        palette[:, BODY] = BODY_BGR
+        palette[:, BACKGROUND] = self.rng.uniform(60, 180, (count, 1)) * self.rng.uniform(0.9, 1.1, (count, 3))
+        palette *= self._uniform(self.brightness, count)[:, None, None]
+        palette *= 1 + self.rng.uniform(-self.white_balance, self.white_balance, (count, 1, 3)).astype(np.float32)
+        frames = np.take(palette.reshape(-1, 3), cells, axis=0)
+
+        # 한쪽에서 들어오는 조명으로 생기는 밝기 기울기
+        ys = np.linspace(-0.5, 0.5, height, dtype=np.float32)[None, :, None]
+        xs = np.linspace(-0.5, 0.5, width, dtype=np.float32)[None, None, :]
+        direction = self.rng.uniform(0, 2 * np.pi, count)
+        slope = self._uniform((0, self.gradient), count)
+        gx = (np.cos(direction) * slope).astype(np.float32)[:, None, None]
+        gy = (np.sin(direction) * slope).astype(np.float32)[:, None, None]
+        frames *= (1 + gx * xs + gy * ys)[..., None]
+
+        # 반사광 : 하얗게 날아가는 둥근 영역. 반사가 있는 프레임만 계산한다.
+        glared = np.flatnonzero(self.rng.random(count) < self.glare)
+        if len(glared):
+            short = min(height, width)
+            gx = self._uniform((0.3, 0.7), len(glared))[:, None, None] * width
+            gy = self._uniform((0.3, 0.7), len(glared))[:, None, None] * height
+            radius = self._uniform((0.03, 0.08), len(glared))[:, None, None] * short
+            strength = self._uniform((0.4, 1.0), len(glared))[:, None, None]
+            spot = strength * np.exp(-((np.arange(width, dtype=np.float32) - gx) ** 2
+                                        + (np.arange(height, dtype=np.float32)[:, None] - gy) ** 2) / (2 * radius ** 2))
+            frames[glared] += (255 - frames[glared]) * spot[..., None]
+
+        # 흐림과 노이즈. 노이즈는 미리 만들어둔 큰 노이즈 이미지에서 프레임마다 다른 위치를 잘라 쓴다.
+        sigmas = self._uniform(self.blur, count)
+        noise_levels = self._uniform(self.noise, count)
+        bank = self._noise_bank()
+        offsets_y = self.rng.integers(0, bank.shape[0] - height + 1, count)
+        offsets_x = self.rng.integers(0, bank.shape[1] - width + 1, count)
+        for n in range(count):
+            if sigmas[n] > 0.3:
+                cv2.GaussianBlur(frames[n], (0, 0), float(sigmas[n]), dst=frames[n])
+            cv2.scaleAdd(bank[offsets_y[n]:offsets_y[n] + height, offsets_x[n]:offsets_x[n] + width], float(noise_levels[n]), frames[n], dst=frames[n])
+        np.clip(frames, 0, 255, out=frames)
+        return frames.astype(np.uint8), centers
+
+    def _noise_bank(self):
+        height, width = self.size
+        if self._noise is None or self._noise.shape[:2] != (2 * height, 2 * width):
+            self._noise = self.rng.standard_normal((2 * height, 2 * width, 3), dtype=np.float32)
+        return self._noise
+
+    def render(self, labels) -> tuple[np.ndarray, np.ndarray]:
+        # 9글자 색상 문자열 목록 -> (N, H, W, 3) BGR 프레임, (N, 9, 2) 스티커 중심 (x, y)
+        labels = list(labels)
+        frames = np.empty((len(labels), *self.size, 3), dtype=np.uint8)
+        centers = np.empty((len(labels), 9, 2), dtype=np.float32)
+        for start in range(0, len(labels), self.batch_size):
+            end = start + self.batch_size
+            frames[start:end], centers[start:end] = self._render_batch(labels[start:end])
+        return frames, centers
+
+    def render_cube(self, cubestring: str, face='F') -> tuple[np.ndarray, np.ndarray]:
+        frames, centers = self.render([face_labels(cubestring, face)])
+        return frames[0], centers[0]
+
+    def random_labels(self, count) -> list[str]:
+        # 풀 수 있는 무작위 상태의 무작위 면 (센터 색도 골고루 나온다)
+        seed = int(self.rng.integers(2 ** 32))
+        faces = self.rng.integers(0, 6, count)
+        return [face_labels(cubestring, FACES[face]) for cubestring, face in zip(random_states(count, seed).to_strings(), faces)]
+
+
+def score_detection(engine, frames, labels) -> dict:
+    # 만든 프레임을 DetectionEngine으로 읽어서 스티커/면 정확도와 처리 속도를 잰다.
+    correct = faces = 0
+    start = time.perf_counter()
+    for frame, expected in zip(frames, labels):
+        if engine.locator is not None:
+            # 프레임끼리 이어지지 않으므로 이전 위치를 쓰지 않고 매번 전체에서 찾는다.
+            engine.locator.reset()
+        detected = engine.detect(frame).labels
+        matches = sum(a == b for a, b in zip(detected, expected))
+        correct += matches
+        faces += matches == 9
+    elapsed = time.perf_counter() - start
+    return {
+        'frames': len(labels),
+        'sticker_accuracy': correct / (9 * len(labels)) if labels else 0.0,
+        'face_accuracy': faces / len(labels) if labels else 0.0,
+        'fps': len(labels) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def save_frames(directory, frames, labels, centers):
+    # 이미지 폴더 입력(ImageDirectorySource)에서 파일 이름 순서대로 읽히도록 번호를 붙이고, 정답은 labels.jsonl에 둔다.
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'labels.jsonl'), 'w') as f:
+        for index, (frame, face, points) in enumerate(zip(frames, labels, centers)):
+            name = f'{index:06d}.png'
+            cv2.imwrite(os.path.join(directory, name), frame)
+            f.write(json.dumps({'image': name, 'labels': face, 'centers': np.round(points.astype(np.float64), 1).tolist()}) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render labeled synthetic cube face frames')
+    parser.add_argument('output', nargs='?', help='folder to write numbered PNG frames and labels.jsonl')
+    parser.add_argument('-n', '--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--size', default='320x240', help='frame WIDTHxHEIGHT')
+    parser.add_argument('--cube', help='render this facelet string (Cube format) instead of random states')
+    parser.add_argument('--face', default='F', choices=list(FACES), help='face of --cube to render')
+    parser.add_argument('--score', action='store_true', help='run DetectionEngine on the frames and print accuracy and FPS')
+    parser.add_argument('--localize', action='store_true', help='score with the grid locator instead of the centered square')
+    args = parser.parse_args(argv)
+
+    width, height = (int(x) for x in args.size.lower().split('x'))
+    generator = SyntheticFaceGenerator((height, width), args.seed)
+    labels = [face_labels(args.cube, args.face)] * args.count if args.cube else generator.random_labels(args.count)
+    start = time.perf_counter()
+    frames, centers = generator.render(labels)
+    print(f"rendered {len(frames)} frames in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.output:
+        save_frames(args.output, frames, labels, centers)
+    if args.score:
+        from module.detection import DetectionEngine
+        from module.localization import CubeLocator
+        engine = DetectionEngine(locator=CubeLocator() if args.localize else None)
+        print(json.dumps(score_detection(engine, frames, labels)))
+
+
+if __name__ == '__main__':
+    main()
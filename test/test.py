@@ -1,10 +1,42 @@
 import os
 import sys
+import tempfile
+import threading
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import unittest
+from unittest import mock
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from module import color
+from module.color import ColorUtils
 from module.cube import Cube
+from module.cube_batch import CubeBatch, verify_solutions
+from module.cube_codec import decode_state, encode_state
+from module.cube_renderer import CubeNetRenderer
+from module.cube_state import CubeState, MOVES, invert_moves
+from module.batch import solve_line
+from module.benchmark import bench_is_valid, compare, summarize
+from module.calibration import calibrate
+from module.cubie import check_cube
+from module.detection import ArraySource, DetectionEngine
+from module.color_detector import ColorDetectorThread
+from module.frame_pipeline import FrameBufferPool, LatestFrameGrabber, RateLimiter
+from module.localization import CubeLocator
+from module.metrics import StageMetrics, METRICS
+from module.overlay import OverlayRenderer, _draw_static
+from module.facelet import ROTATION_PERMUTATIONS
+from module.sampler import StickerSampler
+from module.scramble import random_scrambles, random_states
+from module.solve_cache import SolutionCache
+from module.solver import ANYTIME_SOLVER, AnytimeSolver, solve_anytime
+from module.solver_worker import SolverThread
+from module.stability import AutoCapture, StickerVoteBuffer
+from module.state_store import CubeStateStore
+from module.synthetic import SyntheticFaceGenerator, face_labels, score_detection
 
 class TestCubeString(unittest.TestCase):
     def test_cube_string(self):
@@ -13,5 +45,685 @@ class TestCubeString(unittest.TestCase):
         
         self.assertEqual(cube_str, cube._parse_face())
 
+class TestCubeValidator(unittest.TestCase):
+    scrambled = 'DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD'
+
+    def swap(self, cube_str, *pairs):
+        facelets = list(cube_str)
+        for a, b in pairs:
+            facelets[a], facelets[b] = facelets[b], facelets[a]
+        return ''.join(facelets)
+
+    def test_valid_cube(self):
+        self.assertEqual((True, ''), check_cube(self.scrambled))
+
+    def test_invalid_cubes(self):
+        cases = {
+            'one edge flipped (edge flip parity is off; the edge cannot be pinpointed)': self.swap(self.scrambled, (5, 10)),
+            'one corner twisted clockwise (corner twist parity is off; the corner cannot be pinpointed)': self.swap(self.scrambled, (8, 9), (8, 20)),
+            'one corner twisted counter-clockwise (corner twist parity is off; the corner cannot be pinpointed)': self.swap(Cube()._parse_face(), (8, 20), (8, 9)),
+            'two pieces (corners or edges) swapped (permutation parity is off)': self.swap(Cube()._parse_face(), (5, 7), (10, 19)),
+            'facelet U appears 10 times': self.scrambled[:53] + 'U',
+        }
+        for reason, cube_str in cases.items():
+            self.assertEqual((False, reason), check_cube(cube_str))
+
+        # 코너 URF와 UFL을 방향은 그대로 두고 맞바꾼 경우
+        two_corners = self.swap(Cube()._parse_face(), (8, 6), (9, 18), (20, 38))
+        self.assertEqual((False, 'two pieces (corners or edges) swapped (permutation parity is off)'), check_cube(two_corners))
+
+    def test_cube_is_valid(self):
+        cube = Cube(self.scrambled)
+        self.assertTrue(cube.is_valid()[0])
+        self.assertTrue(cube.solve())
+
+class TestCubeState(unittest.TestCase):
+    def test_string_round_trip(self):
+        state = CubeState(TestCubeValidator.scrambled)
+        self.assertEqual(TestCubeValidator.scrambled, str(state))
+        self.assertEqual(TestCubeValidator.scrambled[18:27], state.face('F'))
+        self.assertEqual(state, CubeState(str(state)))
+
+    def test_moves(self):
+        solved = CubeState()
+        for name in MOVES:
+            self.assertEqual(solved.apply(name).apply(invert_moves(name)), solved)
+        self.assertEqual(solved, solved.apply("R U R' U' " * 6))
+        self.assertEqual(solved, solved.apply('F2').apply('F2'))
+
+        scrambled = CubeState(TestCubeValidator.scrambled)
+        self.assertTrue(scrambled.apply(Cube(str(scrambled)).solve()).is_solved())
+
+    def test_unknown_move(self):
+        with self.assertRaises(ValueError):
+            CubeState().apply('R3')
+
+class TestScramble(unittest.TestCase):
+    def test_random_states_are_valid(self):
+        cubestrings = random_states(200, seed=1).to_strings()
+
+        self.assertEqual(cubestrings, random_states(200, seed=1).to_strings())
+        for cubestring in cubestrings:
+            self.assertEqual((True, ''), check_cube(cubestring))
+
+    def test_random_scrambles(self):
+        scrambles, states = random_scrambles(20, 15, seed=2)
+
+        for scramble, cubestring in zip(scrambles, states.to_strings()):
+            self.assertEqual(15, len(scramble.split()))
+            self.assertEqual(CubeState().apply(scramble), CubeState(cubestring))
+
+class TestStateStore(unittest.TestCase):
+    def test_encoding_round_trip(self):
+        for cubestring in random_states(100, seed=3).to_strings() + [str(CubeState())]:
+            record = encode_state(cubestring)
+            self.assertEqual(9, len(record))
+            self.assertEqual(cubestring, decode_state(record))
+        with self.assertRaises(ValueError):
+            encode_state(TestCubeValidator.scrambled[:53] + 'U')
+
+    def test_counts_survive_reopen(self):
+        cubestrings = random_states(50, seed=4).to_strings()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scans.r3s')
+            with CubeStateStore(path) as store:
+                store.add_many(cubestrings)
+                self.assertEqual(2, store.add(cubestrings[7]))
+
+            # 인덱스가 없어도 기록 파일에서 다시 만든다.
+            os.remove(path + '.idx')
+            with CubeStateStore(path) as store:
+                self.assertEqual((51, 50), (store.records, len(store)))
+                self.assertEqual(2, store.count(cubestrings[7]))
+                self.assertEqual(0, store.count(str(CubeState().apply('R'))))
+                self.assertEqual(cubestrings[7], store.state(store.first_seen(cubestrings[7])))
+
+    def test_interrupted_batch_is_not_counted_twice(self):
+        cubestrings = random_states(10, seed=5).to_strings()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scans.r3s')
+            store = CubeStateStore(path)
+            insert = store._insert
+            calls = []
+
+            def interrupted_insert(key, position):
+                calls.append(position)
+                if len(calls) == 6:
+                    raise KeyboardInterrupt
+                return insert(key, position)
+            store._insert = interrupted_insert
+            with self.assertRaises(KeyboardInterrupt):
+                store.add_many(cubestrings)
+            # 헤더를 쓰지 못하고 프로세스가 끝난 상황
+            store._slots.flush()
+            store._log.close()
+
+            with CubeStateStore(path) as store:
+                self.assertEqual(10, len(store))
+                self.assertEqual([1] * 10, [store.count(cubestring) for cubestring in cubestrings])
+
+class TestSolutionCache(unittest.TestCase):
+    scrambled = TestCubeValidator.scrambled
+
+    def test_lru_eviction(self):
+        cache = SolutionCache(maxsize=2, canonical=False)
+        cache.put('a', 'R')
+        cache.put('b', 'U')
+        cache.get('a')
+        cache.put('c', 'F')
+
+        self.assertEqual('R', cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1}, cache.stats())
+
+    def test_rotated_states_share_entry(self):
+        cache = SolutionCache()
+        for perm in ROTATION_PERMUTATIONS:
+            rotated = ''.join(self.scrambled[i] for i in perm)
+            self.assertTrue(check_cube(rotated)[0])
+            cache.solve(rotated)
+
+        self.assertEqual(1, len(cache))
+        self.assertEqual(len(ROTATION_PERMUTATIONS) - 1, cache.hits)
+
+class TestBatchSolve(unittest.TestCase):
+    def test_solve_line(self):
+        color_string = TestCubeValidator.scrambled.translate(str.maketrans('URFDLB', 'yogwrb'))
+        result = solve_line((3, color_string))
+
+        self.assertEqual(3, result['line'])
+        self.assertEqual(len(result['moves'].split()), result['move_count'])
+        self.assertIn('error', solve_line((4, 'y' * 9 + color_string[9:])))
+        self.assertIn('error', solve_line((5, 'not a cube')))
+
+    def test_verify_solutions(self):
+        scrambles = ["R U R' U'", 'F2 D L', '', "B' L2 U D2 R F'"]
+        cubestrings = CubeBatch.from_strings([str(CubeState())] * 4).apply_each(scrambles).to_strings()
+        for scramble, cubestring in zip(scrambles, cubestrings):
+            self.assertEqual(CubeState().apply(scramble), CubeState(cubestring))
+
+        solutions = [' '.join(invert_moves(scramble)) for scramble in scrambles]
+        self.assertEqual([], verify_solutions(cubestrings, solutions).tolist())
+        solutions[1] += ' U'
+        self.assertEqual([1], verify_solutions(cubestrings, solutions).tolist())
+
+class TestAnytimeSolver(unittest.TestCase):
+    scrambled = TestCubeValidator.scrambled
+
+    def setUp(self):
+        self.addCleanup(ANYTIME_SOLVER.close)
+
+    def test_budgeted_solve(self):
+        moves = solve_anytime(self.scrambled, budget=10, target=20)
+
+        self.assertLessEqual(len(moves.split()), 20)
+        self.assertTrue(CubeState(self.scrambled).apply(moves).is_solved())
+
+    def test_deadline_kills_search(self):
+        # 이 상태는 19수 풀이를 바로 찾지만 18수 이하를 찾는 탐색은 오래 멈춘다.
+        improved = []
+        start = time.perf_counter()
+        moves = solve_anytime(self.scrambled, budget=1.5, target=1, on_improve=lambda moves, elapsed: improved.append(moves))
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 5)
+        self.assertEqual(improved[-1], moves)
+        self.assertTrue(CubeState(self.scrambled).apply(moves).is_solved())
+        self.assertIsNone(ANYTIME_SOLVER._process)
+
+    def test_deadline_without_solution(self):
+        solver = AnytimeSolver()
+        self.addCleanup(solver.close)
+        solver._ensure_worker()
+        process = solver._process
+
+        self.assertEqual([], list(solver.solutions(self.scrambled, budget=1, max_depth=17)))
+        process.join(1)
+        self.assertFalse(process.is_alive())
+        self.assertIsNone(solver._process)
+
+class TestSolverThread(unittest.TestCase):
+    class BlockingCache:
+        # 'slow' 상태는 release가 세워질 때까지 풀지 않는다.
+        def __init__(self) -> None:
+            self.started = threading.Event()
+            self.release = threading.Event()
+            self.finished = threading.Event()
+
+        def solve(self, cubestring, search=None):
+            try:
+                if cubestring.startswith('slow'):
+                    self.started.set()
+                    self.release.wait(5)
+                if cubestring.endswith('invalid'):
+                    raise ValueError('invalid cube')
+                return f'moves of {cubestring}'
+            finally:
+                self.finished.set()
+
+    def start_thread(self, cache, solver=None, **kwargs):
+        thread = SolverThread(cache, solver or mock.Mock(**{'warm_up.return_value': 0.0}), **kwargs)
+        self.results = []
+        self.done = threading.Event()
+        for name in ('solved', 'failed'):
+            getattr(thread, name).connect(lambda request_id, text, elapsed, name=name: (self.results.append((name, request_id, text)), self.done.set()), Qt.DirectConnection)
+        thread.start()
+        self.addCleanup(thread.stop)
+        return thread
+
+    def test_ready_after_child_warm_up(self):
+        solver = AnytimeSolver()
+        self.addCleanup(solver.close)
+        warmed_up = []
+        ready = threading.Event()
+        thread = SolverThread(SolutionCache(), solver)
+        thread.ready.connect(lambda seconds: (warmed_up.append(seconds), ready.set()), Qt.DirectConnection)
+        thread.start()
+        self.addCleanup(thread.stop)
+
+        self.assertTrue(ready.wait(30))
+        self.assertGreater(warmed_up[0], 0)
+        self.assertTrue(solver._process.is_alive())
+
+    def test_warm_up_failure_is_reported(self):
+        solver = mock.Mock(**{'warm_up.side_effect': RuntimeError('pruning table missing')})
+        failed = []
+        thread = SolverThread(self.BlockingCache(), solver)
+        thread.warm_up_failed.connect(failed.append, Qt.DirectConnection)
+        thread.solved.connect(lambda request_id, moves, elapsed: self.done.set(), Qt.DirectConnection)
+        self.done = threading.Event()
+        thread.start()
+        self.addCleanup(thread.stop)
+
+        # 예열에 실패해도 스레드는 계속 요청을 처리한다.
+        thread.request('fast')
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(['pruning table missing'], failed)
+
+    def test_request_ids_increase(self):
+        thread = SolverThread(self.BlockingCache(), mock.Mock())
+        first, second = thread.request('a'), thread.request('b')
+
+        self.assertEqual(first + 1, second)
+        self.assertFalse(thread.is_current(first))
+        self.assertTrue(thread.is_current(second))
+
+    def test_stale_result_is_dropped(self):
+        cache = self.BlockingCache()
+        thread = self.start_thread(cache)
+        thread.request('slow')
+        self.assertTrue(cache.started.wait(5))
+        second = thread.request('fast')
+        cache.release.set()
+
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual([('solved', second, 'moves of fast')], self.results)
+
+    def test_cancel_suppresses_signals(self):
+        for cubestring in ('slow', 'slow invalid'):
+            cache = self.BlockingCache()
+            thread = self.start_thread(cache)
+            thread.request(cubestring)
+            self.assertTrue(cache.started.wait(5))
+            thread.cancel()
+            cache.release.set()
+
+            self.assertTrue(cache.finished.wait(5))
+            self.assertFalse(self.done.wait(0.3))
+            self.assertEqual([], self.results)
+
+    def test_cancel_kills_plain_search(self):
+        # max_depth가 최단 풀이보다 작으면 kociemba가 오래 멈추므로 자식 프로세스를 종료해야 한다.
+        solver = AnytimeSolver()
+        self.addCleanup(solver.close)
+        thread = self.start_thread(SolutionCache(), solver, max_depth=17)
+        thread.request(TestCubeValidator.scrambled)
+        deadline = time.perf_counter() + 30
+        while (solver._process is None or thread._pending is not None) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        process = solver._process
+        thread.cancel()
+
+        process.join(5)
+        self.assertFalse(process.is_alive())
+        self.assertEqual([], self.results)
+
+class TestBenchmark(unittest.TestCase):
+    def test_summary_and_regression(self):
+        summary = summarize([0.001] * 98 + [0.010, 0.020])
+        self.assertEqual(1.0, summary['p50_ms'])
+        self.assertGreater(summary['p99_ms'], summary['p95_ms'])
+        self.assertEqual(5, bench_is_valid(count=5)['count'])
+
+        baseline = {'benchmarks': {'solve': {'p50_ms': 10.0}, 'draw': {'p50_ms': 1.0}}}
+        report = {'benchmarks': {'solve': {'p50_ms': 12.0}, 'draw': {'p50_ms': 1.5}, 'startup': {'p50_ms': 900.0}}}
+        regressions = compare(report, baseline, threshold=0.25)
+        self.assertEqual(['draw'], [r['name'] for r in regressions])
+
+class TestColorLookupTable(unittest.TestCase):
+    def setUp(self):
+        color.reset_COLORS()
+
+    def brute_force_color_name(self, hsv):
+        for color_name, color_hsv in color.COLORS.items():
+            if np.all(np.array(color_hsv.min_hsv) <= hsv) and np.all(hsv <= np.array(color_hsv.max_hsv)):
+                return color_name
+        return 'u'
+
+    def test_matches_range_scan(self):
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, (2000, 3)).astype(np.uint8)
+        pixels[:, 0] %= 180
+        expected = "".join(self.brute_force_color_name(p) for p in pixels)
+
+        self.assertEqual(expected, ColorUtils.get_color_names(pixels))
+
+    def test_rebuild_on_update(self):
+        self.assertEqual('u', ColorUtils.get_color_name((60, 20, 20)))
+        color.COLORS['g'].set_min_hsv((40, 10, 10))
+        self.assertEqual('g', ColorUtils.get_color_name((60, 20, 20)))
+
+    def test_red_hue_wrap_around(self):
+        color.COLORS['r'].update_hsv((175, 150, 150))
+        self.assertEqual('r', ColorUtils.get_color_name((2, 150, 150)))
+        color.COLORS['r'].update_hsv((3, 150, 150))
+        self.assertEqual('r', ColorUtils.get_color_name((176, 150, 150)))
+
+class TestColorModel(unittest.TestCase):
+    def setUp(self):
+        color.reset_COLORS()
+
+    def test_snapshot_is_unchanged_by_update(self):
+        before = color.COLOR_MODEL.snapshot()
+        after = color.COLOR_MODEL.update_hsv('g', (60, 150, 150))
+        self.assertEqual(before.version + 1, after.version)
+        self.assertNotEqual(before['g'], after['g'])
+        self.assertEqual((60, 150, 150), after['g'].main_hsv)
+        pixel = np.array([80, 60, 60], dtype=np.uint8)
+        self.assertEqual('g', color.COLOR_CODES[before.lookup(pixel)])
+        self.assertEqual('u', color.COLOR_CODES[after.lookup(pixel)])
+
+    def test_table_built_once_per_ranges(self):
+        snapshot = color.COLOR_MODEL.snapshot()
+        snapshot.lookup((0, 0, 0))
+        self.assertIs(snapshot.table, snapshot.table)
+        # 대표값만 바뀌면 범위가 같으므로 테이블을 다시 만들지 않는다.
+        moved = color.COLOR_MODEL.set('g', snapshot['g'].replace(hsv=(71, 200, 200)))
+        self.assertIs(snapshot.table, moved.table)
+        widened = color.COLOR_MODEL.set('g', moved['g'].replace(min_hsv=(40, 10, 10)))
+        self.assertIsNot(moved.table, widened.table)
+
+    def test_reset_visible_through_imported_view(self):
+        from module.color import COLORS
+        COLORS['w'].update_hsv((90, 90, 90))
+        color.reset_COLORS()
+        self.assertEqual(color.COLOR_MODEL.snapshot()['w'], COLORS['w'].value)
+        self.assertEqual(['r', 'g', 'b', 'y', 'w', 'o'], list(COLORS))
+
+class TestCalibration(unittest.TestCase):
+    def setUp(self):
+        color.reset_COLORS()
+
+    def test_clusters_dim_and_bright_stickers(self):
+        # 면마다 밝기가 다른 조명에서 찍은 54개 스티커
+        bgr = {'U': (0, 215, 255), 'R': (0, 120, 255), 'F': (60, 170, 20), 'D': (230, 230, 230), 'L': (40, 30, 200), 'B': (170, 70, 10)}
+        cubestring = TestCubeValidator.scrambled
+        gain = np.linspace(0.6, 1.1, 54)[:, None]
+        pixels = np.clip(np.array([bgr[face] for face in cubestring]) * gain, 0, 255).astype(np.uint8)
+        samples = cv2.cvtColor(pixels[:, None, :], cv2.COLOR_BGR2HSV)[:, 0]
+
+        for space in ('lab', 'hsv'):
+            result = calibrate(samples, space)
+            self.assertEqual(cubestring, result.cubestring, space)
+            self.assertTrue(result.valid)
+
+        result.apply()
+        expected = cubestring.translate(str.maketrans('URFDLB', 'yogwrb'))
+        self.assertEqual(expected, ColorUtils.get_color_names(samples))
+
+class TestDetectionEngine(unittest.TestCase):
+    def setUp(self):
+        color.reset_COLORS()
+
+    def test_detect_face(self):
+        hsv_colors = {'g': (60, 200, 200), 'b': (120, 200, 200), 'w': (0, 10, 200)}
+        face = 'gbwwgbbwg'
+        hsv = np.zeros((480, 640, 3), dtype=np.uint8)
+        for index, color_name in enumerate(face):
+            y, x = 120 + (index // 3) * 80, 200 + (index % 3) * 80
+            hsv[y:y + 80, x:x + 80] = hsv_colors[color_name]
+        frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+        results = [DetectionEngine().detect(f) for f in ArraySource([frame, frame])]
+
+        self.assertEqual(2, len(results))
+        self.assertEqual(face, results[0].labels)
+        self.assertTrue(np.all(results[0].confidences == 1.0))
+
+    def test_localize_rotated_face(self):
+        # 가운데 ROI에서 벗어나 기울어진 면도 격자를 찾아서 읽는다.
+        hsv_colors = {'g': (60, 200, 200), 'b': (120, 200, 200), 'w': (0, 10, 200), 'r': (0, 200, 200)}
+        face = 'gbwrgbbwr'
+        bgr = {name: tuple(int(c) for c in cv2.cvtColor(np.uint8([[hsv]]), cv2.COLOR_HSV2BGR)[0, 0]) for name, hsv in hsv_colors.items()}
+        frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+        angle, pitch, origin = 0.3, 70, np.array([950, 220])
+        axis_u = np.array([np.cos(angle), np.sin(angle)]) * pitch
+        axis_v = np.array([-np.sin(angle), np.cos(angle)]) * pitch
+        quad = np.array([(-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)])
+        body = (quad * 3.2)[:, :1] * axis_u + (quad * 3.2)[:, 1:] * axis_v + origin
+        cv2.fillConvexPoly(frame, np.rint(body).astype(np.int32), (20, 20, 20), cv2.LINE_8)
+        centers = []
+        for index, color_name in enumerate(face):
+            center = origin + (index % 3 - 1) * axis_u + (index // 3 - 1) * axis_v
+            sticker = (quad * 0.84)[:, :1] * axis_u + (quad * 0.84)[:, 1:] * axis_v + center
+            cv2.fillConvexPoly(frame, np.rint(sticker).astype(np.int32), bgr[color_name], cv2.LINE_8)
+            centers.append(center)
+
+        engine = DetectionEngine(locator=CubeLocator())
+        results = [engine.detect(frame) for _ in range(3)]
+
+        self.assertEqual(face, results[0].labels)
+        self.assertLess(np.abs(results[0].location.centers - centers).max(), 0.1 * pitch)
+        # 두 번째 프레임부터는 이전 위치 주변만 찾는다.
+        self.assertTrue(results[2].location.tracked)
+        # hsv는 고정 ROI일 때와 같이 ROI 이미지이고, 스티커 픽셀은 patches에 따로 있다.
+        x, y, _ = results[2].roi
+        x1, y1 = x + results[2].hsv.shape[1], y + results[2].hsv.shape[0]
+        np.testing.assert_array_equal(cv2.cvtColor(frame[y:y1, x:x1], cv2.COLOR_BGR2HSV), results[2].hsv)
+        self.assertEqual((9, 3), results[2].patches.shape[::2])
+        self.assertEqual(face, results[2].labels)
+        self.assertIsNone(DetectionEngine(locator=CubeLocator()).detect(np.zeros_like(frame)).location)
+
+class TestSyntheticFaceGenerator(unittest.TestCase):
+    def setUp(self):
+        color.reset_COLORS()
+
+    def test_clean_frames_are_detected(self):
+        labels = [face_labels(c, face) for c, face in zip(random_states(6, seed=4).to_strings(), 'URFDLB')]
+        generator = SyntheticFaceGenerator((240, 320), seed=0, brightness=(1, 1), white_balance=0, gradient=0,
+                                           blur=(0, 0), noise=(0, 0), glare=0, rotation=0, perspective=0, offset=0)
+        frames, centers = generator.render(labels)
+
+        self.assertEqual((6, 240, 320, 3), frames.shape)
+        self.assertEqual((6, 9, 2), centers.shape)
+        self.assertEqual('yyyyyyyyy', face_labels(Cube().state.to_string(), 'U'))
+        score = score_detection(DetectionEngine(), frames, labels)
+        self.assertEqual(1.0, score['face_accuracy'])
+
+    def test_seed_is_reproducible(self):
+        labels = ['gbwrgoyyb'] * 3
+        first, _ = SyntheticFaceGenerator((60, 80), seed=7).render(labels)
+        second, _ = SyntheticFaceGenerator((60, 80), seed=7).render(labels)
+        self.assertTrue(np.array_equal(first, second))
+
+class TestStageMetrics(unittest.TestCase):
+    def test_rolling_window_percentiles(self):
+        metrics = StageMetrics(window=4)
+        for i, seconds in enumerate([0.100, 0.100, 0.001, 0.002, 0.003, 0.004]):
+            metrics.record('read', seconds, now=i * 0.5)
+        summary = metrics.snapshot()['read']
+
+        # 오래된 두 기록은 창 밖으로 밀려난다.
+        self.assertEqual(6, summary['count'])
+        self.assertEqual(4.0, summary['max_ms'])
+        self.assertEqual(2.0, summary['rate'])
+        self.assertIn('read p95', metrics.status_text())
+        self.assertIn('r3_stage_seconds{stage="read",quantile="0.95"}', metrics.prometheus_text())
+
+    def test_detection_records_stages(self):
+        METRICS.reset()
+        DetectionEngine().detect(np.zeros((120, 160, 3), dtype=np.uint8))
+        self.assertTrue({'hsv', 'classify'} <= set(METRICS.snapshot()))
+
+class TestFrameBufferPool(unittest.TestCase):
+    def test_reuse_released_buffers(self):
+        pool = FrameBufferPool(2)
+        first = pool.acquire((4, 4, 3))
+        second = pool.acquire((4, 4, 3))
+
+        self.assertIsNone(pool.acquire((4, 4, 3)))
+        pool.release(first)
+        pool.release(np.empty((4, 4, 3), dtype=np.uint8))
+        self.assertIs(first, pool.acquire((4, 4, 3)))
+        self.assertIsNone(pool.acquire((4, 4, 3)))
+        self.assertEqual((2, 2), (pool.allocations, pool.misses))
+        self.assertIsNot(first, second)
+
+class TestFramePipeline(unittest.TestCase):
+    def delayed(self, frames, delay=0.0):
+        # 카메라처럼 프레임 사이에 시간이 걸리는 입력
+        for frame in frames:
+            time.sleep(delay)
+            yield frame
+
+    def frames(self, count, delay=0.0):
+        return self.delayed((np.full((48, 64, 3), i, dtype=np.uint8) for i in range(count)), delay)
+
+    def test_grabber_keeps_latest_frame(self):
+        grabber = LatestFrameGrabber(ArraySource(self.frames(10))).start()
+        grabber._thread.join(5)
+
+        frame_id, frame = grabber.get(timeout=1)
+        self.assertEqual((10, 9), (frame_id, frame[0, 0, 0]))
+        self.assertEqual((10, 9), (grabber.grabbed, grabber.dropped))
+        self.assertIsNone(grabber.get(timeout=0.1))
+        # 다 쓴 프레임은 풀로 돌아가서 다음 읽기에 다시 쓰인다.
+        grabber.release(frame)
+        self.assertIs(frame, grabber.pool.acquire(frame.shape))
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(10)
+        self.assertEqual([True, False, True, False, True], [limiter.ready(t) for t in (0.0, 0.05, 0.1, 0.15, 0.3)])
+        self.assertEqual((3, 2), (limiter.passed, limiter.skipped))
+        self.assertTrue(all(RateLimiter().ready(0.0) for _ in range(3)))
+
+    def test_display_does_not_stall_without_frame_displayed(self):
+        thread = ColorDetectorThread(Cube(), source=ArraySource(self.frames(8, delay=0.03)), analysis_fps=None, display_fps=None)
+        thread.display_timeout = 0.0
+        shown = []
+        thread.frame_ready.connect(lambda display_id, image: shown.append(display_id), Qt.DirectConnection)
+        thread.run()
+
+        self.assertGreater(len(shown), 1)
+        self.assertEqual(len(shown) - 1, thread.display_timeouts)
+        # 늦게라도 그리기 완료가 오면 버퍼는 모두 풀로 돌아간다.
+        for display_id in shown:
+            thread.frame_displayed(display_id)
+        self.assertEqual({}, thread._shown)
+        self.assertIsNotNone(thread.rgb_pool.acquire((48, 64, 3)))
+
+    def test_late_frame_displayed_returns_buffers(self):
+        thread = ColorDetectorThread(Cube(), source=ArraySource(self.frames(12, delay=0.03)), analysis_fps=None, display_fps=None)
+        thread.display_timeout = 0.01
+        late, calls = [], []
+
+        def update_video_frame(display_id, image):
+            # 처음 세 프레임은 그리기 완료를 다음 프레임 때 늦게 보낸다.
+            calls.append(display_id)
+            if len(calls) <= 3:
+                late.append(display_id)
+                return
+            while late:
+                thread.frame_displayed(late.pop())
+            thread.frame_displayed(display_id)
+        thread.frame_ready.connect(update_video_frame, Qt.DirectConnection)
+        thread.run()
+
+        self.assertEqual(3, thread.display_timeouts)
+        self.assertGreater(len(calls), 6)
+        # 버퍼 두 개가 늦은 완료를 기다리는 동안(세 번째, 네 번째 프레임)만 풀이 비고, 그 뒤로는 다시 돌려쓴다.
+        self.assertEqual(2, thread.rgb_pool.misses)
+        self.assertEqual({}, thread._shown)
+
+    def test_headless_skips_display(self):
+        thread = ColorDetectorThread(Cube(), source=ArraySource(self.frames(3)), analysis_fps=None, display_fps=None)
+        thread.run()
+
+        self.assertEqual(0, thread.display_limiter.passed)
+        self.assertGreater(thread.analysis_limiter.passed, 0)
+
+    def test_auto_capture_keeps_stable_frame_samples(self):
+        color.reset_COLORS()
+        clean = dict(white_balance=0, gradient=0, blur=(0, 0), noise=(0, 0), glare=0, rotation=0, perspective=0, offset=0)
+        labels = face_labels(TestCubeValidator.scrambled, 'F')
+        bright, _ = SyntheticFaceGenerator((240, 320), seed=0, brightness=(1, 1), **clean).render([labels] * 8)
+        dim, _ = SyntheticFaceGenerator((240, 320), seed=0, brightness=(0.85, 0.85), **clean).render([labels] * 4)
+        thread = ColorDetectorThread(Cube(), source=ArraySource(self.delayed(np.concatenate([bright, dim]), 0.03)), analysis_fps=None, display_fps=None, auto_capture_frames=2)
+        thread.auto_capture_enabled = True
+        stable = []
+        thread.face_stable.connect(lambda face_info, samples: stable.append((face_info, samples)), Qt.DirectConnection)
+        thread.run()
+
+        self.assertEqual(1, len(stable))
+        face_info, samples = stable[0]
+        # 캡처를 처리할 때는 이미 어두운 프레임을 읽고 있어도 안정된 프레임의 값이 저장된다.
+        self.assertFalse(np.array_equal(samples, thread.sticker_hsv))
+        self.assertTrue(thread.save_color_info(face_info, samples))
+        np.testing.assert_array_equal(samples, thread.face_samples[ColorUtils.color_string_to_face(face_info)[4]])
+
+class TestOverlayRenderer(unittest.TestCase):
+    def test_cached_layer_matches_direct_drawing(self):
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (480, 640, 3)).astype(np.uint8)
+        roi = DetectionEngine.roi_rect(frame.shape)
+        renderer = OverlayRenderer()
+
+        for capture_step in (None, 'F', 'U'):
+            expected = frame.copy()
+            _draw_static(expected, roi, capture_step, lambda color: color)
+            composed = renderer.compose(frame.copy(), roi, capture_step, '')
+            self.assertTrue(np.array_equal(expected, composed), capture_step)
+
+class TestStickerVoteBuffer(unittest.TestCase):
+    def test_majority_ignores_transient_misreads(self):
+        votes = StickerVoteBuffer(history=4)
+        for labels in ('gggbbbwww', 'gggbbbwww', 'ugyrbbwww', 'gggbbbwww'):
+            votes.push(labels)
+
+        labels, stability = votes.vote()
+        self.assertEqual('gggbbbwww', labels)
+        self.assertEqual([0.75, 1, 0.75, 0.75, 1, 1, 1, 1, 1], stability.tolist())
+
+        # 버퍼가 한 바퀴 돌면 가장 오래된 프레임부터 밀려난다.
+        for _ in range(3):
+            votes.push('rrrrrrrrr')
+        self.assertEqual('rrrrrrrrr', votes.vote()[0])
+        self.assertTrue(np.all(votes.vote()[1] == 0.75))
+
+    def test_tie_is_unknown(self):
+        votes = StickerVoteBuffer(history=8)
+        for labels in ('gggbbbwww', 'bggbbbwww') * 4:
+            votes.push(labels)
+
+        labels, stability = votes.vote()
+        self.assertEqual('uggbbbwww', labels)
+        self.assertEqual(0.5, stability[0])
+
+    def test_auto_capture_after_stable_frames(self):
+        auto = AutoCapture(frames=3)
+        stable = np.ones(9)
+
+        self.assertEqual([False, False, True, False], [auto.update('gggbgbwww', stable) for _ in range(4)])
+        self.assertFalse(auto.update('gggbubwww', stable))
+        self.assertFalse(auto.update('gggbgbwww', stable * 0.5))
+        # 이미 캡처한 센터나 캡처 도우미가 기다리지 않는 센터는 캡처하지 않는다.
+        auto.reset()
+        self.assertFalse(any(auto.update('gggbgbwww', stable, captured={'F'}) for _ in range(4)))
+        self.assertFalse(any(auto.update('gggbgbwww', stable, expected='R') for _ in range(4)))
+        self.assertTrue(any(auto.update('gggbgbwww', stable, expected='F') for _ in range(4)))
+
+class TestCubeNetRenderer(unittest.TestCase):
+    def test_incremental_matches_full_render(self):
+        solved = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'
+        scrambled = TestCubeValidator.scrambled
+        renderer = CubeNetRenderer()
+        renderer.render(solved)
+
+        incremental = renderer.render(scrambled).copy()
+        self.assertTrue(np.array_equal(CubeNetRenderer().render(scrambled), incremental))
+        self.assertTrue(np.array_equal(CubeNetRenderer().render(solved), renderer.render(solved)))
+
+class TestStickerSampler(unittest.TestCase):
+    def test_median_ignores_noisy_pixels(self):
+        roi = np.zeros((90, 90, 3), dtype=np.uint8)
+        roi[..., 0] = 60
+        roi[..., 1:] = 200
+        roi[15, 15] = (120, 0, 0)
+
+        samples = StickerSampler(patch_size=5).sample(roi)
+
+        self.assertEqual((9, 3), samples.shape)
+        self.assertTrue(np.all(samples == (60, 200, 200)))
+
+    def test_red_hue_wrap_around(self):
+        roi = np.full((90, 90, 3), 200, dtype=np.uint8)
+        roi[..., 0] = 178
+        roi[::2, :, 0] = 2
+
+        for method in StickerSampler.METHODS:
+            hue = StickerSampler(patch_size=6, method=method).sample(roi)[:, 0]
+            self.assertTrue(np.all((hue >= 178) | (hue <= 2)), method)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file